@@ -0,0 +1,60 @@
+"""Compare the grouped EMA engines in src.model.utils.model across history sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_model --sizes 1000 100000 1000000 5000000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import synthetic_history
+from src.model.utils import model
+
+
+def masked_model(data):
+    """The original per-problem boolean-mask implementation, kept as a reference."""
+    ema_prob = {}
+    for problem in data['problem'].unique():
+        problem_data = data[data['problem'] == problem]
+        ema_prob[problem] = (problem_data['duration_seconds'] * problem_data['attempts']).ewm(span=10, adjust=False).mean().iloc[-1]
+    total = sum(ema_prob.values())
+    return {problem: ema / total for problem, ema in ema_prob.items()}
+
+
+def best_time(func, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reference-limit', type=int, default=10000,
+                        help="skip the masked reference implementation above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'problems':>9} {'masked':>10} {'pandas':>10} {'numpy':>10} {'max diff':>10}")
+    for size in args.sizes:
+        data = synthetic_history(size)
+
+        pandas_time, pandas_weights = best_time(model, data, args.repeat)
+        numpy_time, numpy_weights = best_time(lambda d: model(d, engine='numpy'), data, args.repeat)
+        diff = max(abs(pandas_weights[p] - numpy_weights[p]) for p in pandas_weights)
+
+        if size <= args.reference_limit:
+            masked_time, masked_weights = best_time(masked_model, data, 1)
+            diff = max(diff, max(abs(masked_weights[p] - pandas_weights[p]) for p in masked_weights))
+            masked_text = f"{masked_time:>9.3f}s"
+        else:
+            masked_text = f"{'-':>10}"
+
+        print(f"{size:>10} {len(pandas_weights):>9} {masked_text} {pandas_time:>9.3f}s {numpy_time:>9.3f}s {diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Run simulated 120-second sessions headlessly, end to end through QuestionBase.
+
+Sessions use a SimulatedClock and SimulatedSolver, so they run at full speed. With
+--dynamic, each run uses a throwaway data directory seeded with synthetic history and
+exercises the weight model, history store and adaptive sampler as well.
+
+    python -m benchmarks.bench_session --sessions 2000
+    python -m benchmarks.bench_session --sessions 50 --dynamic --history-rows 100000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_history
+from src.base.math_loop import QuestionBase
+from src.base.session import Session, SimulatedClock, SimulatedSolver, run_headless
+from src.model.problem import DEFAULT_RANGES
+
+SETTINGS = {
+    'operations': {'addition': True, 'subtraction': True, 'multiplication': True, 'division': True},
+    'ranges': DEFAULT_RANGES,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--dynamic', action='store_true')
+    parser.add_argument('--history-rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.dynamic:
+            synthetic_history(args.history_rows, seed=args.seed).to_csv(
+                os.path.join(data_dir, 'math_practice_20250101_080000.csv'), index=False)
+
+        settings = dict(SETTINGS, dynamic=args.dynamic)
+        question_base = QuestionBase(settings, seed=args.seed, data_dir=data_dir)
+        if args.dynamic:
+            # Measure sessions, not the one-off model load
+            question_base.model_future.result()
+
+        solver = SimulatedSolver(seed=args.seed)
+        scores = []
+        start = time.perf_counter()
+        for _ in range(args.sessions):
+            session = Session(question_base, clock=SimulatedClock())
+            scores.append(run_headless(session, solver))
+        # Model updates are written in the background; the timing includes them
+        question_base.wait_for_answers()
+        elapsed = time.perf_counter() - start
+
+    answers = sum(scores)
+    print(f"{args.sessions} sessions ({'dynamic' if args.dynamic else 'random'}) in {elapsed:.3f}s: "
+          f"{args.sessions / elapsed:,.0f} sessions/s, {answers / elapsed:,.0f} answers/s, "
+          f"mean score {statistics.mean(scores):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cold-start regression check for the GUI entry point.
+
+Each run starts a fresh interpreter (offscreen Qt, empty data directory), opens the
+settings window, clicks Start and waits for the first problem. Exits non-zero if the
+median time to either milestone exceeds its budget, or if NumPy/pandas were imported
+before the settings window appeared.
+
+    python -m benchmarks.bench_startup --runs 5 --settings-budget-ms 800 --first-problem-budget-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('numpy', 'pandas')
+
+CHILD = """
+import json, sys
+from src.base import startup
+from PySide6.QtWidgets import QApplication
+from src.base.gui import MathSettingsWindow
+
+app = QApplication([])
+window = MathSettingsWindow()
+window.show()
+app.processEvents()
+startup.mark('settings_window')
+heavy = [name for name in %r if name in sys.modules]
+
+window.start_practice()
+app.processEvents()
+window.math_window.close()
+print(json.dumps({'marks': startup.marks, 'heavy_at_settings': heavy}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once(data_root):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, QT_QPA_PLATFORM='offscreen')
+    env.pop('ZETAMAC_STARTUP_TIMING', None)
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=data_root, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--settings-budget-ms', type=float, default=800.0)
+    parser.add_argument('--first-problem-budget-ms', type=float, default=400.0,
+                        help="budget from clicking Start to the first problem being shown")
+    args = parser.parse_args()
+
+    settings_ms, first_problem_ms, heavy = [], [], set()
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as data_root:
+            result = run_once(data_root)
+        marks = result['marks']
+        settings_ms.append(marks['settings_window'] * 1000)
+        first_problem_ms.append((marks['first_problem'] - marks['start_clicked']) * 1000)
+        heavy.update(result['heavy_at_settings'])
+
+    settings_median = statistics.median(settings_ms)
+    first_problem_median = statistics.median(first_problem_ms)
+    print(f"time to settings window: median {settings_median:.1f} ms (budget {args.settings_budget_ms:.0f} ms)")
+    print(f"time to first problem:   median {first_problem_median:.1f} ms (budget {args.first_problem_budget_ms:.0f} ms)")
+
+    failures = []
+    if settings_median > args.settings_budget_ms:
+        failures.append("settings window over budget")
+    if first_problem_median > args.first_problem_budget_ms:
+        failures.append("first problem over budget")
+    if heavy:
+        failures.append(f"imported before the settings window: {', '.join(sorted(heavy))}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
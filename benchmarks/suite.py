@@ -0,0 +1,181 @@
+"""Benchmark suite for the session hot paths and the history/model pipeline.
+
+Covers problem generation (random and adaptive), answer checking, answer logging,
+parse_historical_data (cold and warm store), model() and sample_problems() against
+synthetic histories shaped like data/math_practice_*.csv. Per-call paths report latency
+percentiles; bulk paths report best-of-N time and peak traced memory.
+
+    python -m benchmarks.suite --sizes 1000 100000 1000000
+    python -m benchmarks.suite --save-baseline      # record benchmarks/baseline.json
+    python -m benchmarks.suite --compare            # exit 1 on regressions against it
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import write_history
+from src.base.logger import SessionLogger
+from src.base.math_loop import QuestionBase
+from src.base.session import Session
+from src.model.problem import DEFAULT_RANGES
+from src.model.utils import model, parse_historical_data, sample_problems
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+SETTINGS = {
+    'operations': {'addition': True, 'subtraction': True, 'multiplication': True, 'division': True},
+    'ranges': DEFAULT_RANGES,
+}
+
+
+def per_call(func, calls):
+    """Time each of `calls` invocations; returns latency percentiles in microseconds."""
+    timings = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter_ns()
+        func()
+        timings[i] = time.perf_counter_ns() - start
+
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99]) / 1000
+    return {'calls': calls, 'p50_us': p50, 'p90_us': p90, 'p99_us': p99, 'max_us': timings.max() / 1000}
+
+
+def bulk(func, repeat, setup=None):
+    """Best-of-repeat wall time plus peak traced memory of one extra run."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter_ns()
+        func()
+        timings.append(time.perf_counter_ns() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(timings) / 1000
+    return {'calls': repeat, 'p50_us': best, 'peak_kib': peak / 1024}
+
+
+def bench_session_paths(calls, seed):
+    """Paths that do not depend on history size."""
+    results = {}
+    question_base = QuestionBase(dict(SETTINGS, dynamic=False), seed=seed)
+    results['get_random_problem'] = per_call(question_base.get_random_problem, calls)
+
+    problem = question_base.get_random_problem()
+    results['check_answer'] = per_call(lambda: question_base.check_answer(problem, problem.answer), calls)
+    return results
+
+
+def bench_history(size, calls, repeat, seed):
+    """Paths whose cost depends on how much history has been logged."""
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        data_dir = os.path.join(root, 'data')
+        write_history(data_dir, size, seed=seed)
+        db_path = os.path.join(data_dir, 'history.db')
+
+        def drop_store():
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+        results['parse_historical_data_cold'] = bulk(lambda: parse_historical_data(data_dir), repeat, drop_store)
+        results['parse_historical_data_warm'] = bulk(lambda: parse_historical_data(data_dir), repeat)
+
+        data = parse_historical_data(data_dir)
+        results['model'] = bulk(lambda: model(data), repeat)
+        results['model_numpy'] = bulk(lambda: model(data, engine='numpy'), repeat)
+        results['sample_problems'] = bulk(lambda: sample_problems(data_dir, 240), repeat)
+
+        question_base = QuestionBase(dict(SETTINGS, dynamic=True), seed=seed, data_dir=data_dir)
+        question_base.model_future.result()
+        question_base.get_adaptive_problem()
+        question_base.sampler.wait_ready()
+        results['get_adaptive_problem'] = per_call(question_base.get_adaptive_problem, calls)
+
+        # A start time after the synthetic history, so the session file does not collide with it
+        logger = SessionLogger(data_dir, datetime(2030, 1, 1))
+        session = Session(question_base, logger)
+        session.next_problem()
+        problem = session.current_problem
+        results['log_question_stats'] = per_call(lambda: session.log_question_stats(problem, 1.234, 1), min(calls, 2000))
+        question_base.wait_for_answers()
+        session.close()
+
+    return {f"{name}[{size}]": result for name, result in results.items()}
+
+
+def print_results(results):
+    print(f"{'benchmark':<40} {'calls':>6} {'p50 us':>12} {'p90 us':>10} {'p99 us':>10} {'max us':>10} {'peak KiB':>10}")
+    for name, result in results.items():
+        cells = [f"{result.get(key, float('nan')):>10.1f}" for key in ('p90_us', 'p99_us', 'max_us', 'peak_kib')]
+        print(f"{name:<40} {result['calls']:>6} {result['p50_us']:>12.1f} {' '.join(cells)}")
+
+
+def compare(results, baseline, tolerance):
+    """Return the benchmarks whose median time or peak memory grew beyond tolerance."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for key in ('p50_us', 'peak_kib'):
+            if key in result and key in reference and reference[key] > 0:
+                ratio = result[key] / reference[key]
+                if ratio > tolerance:
+                    regressions.append(f"{name} {key}: {reference[key]:.1f} -> {result[key]:.1f} ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="history sizes in rows (up to 10**7)")
+    parser.add_argument('--calls', type=int, default=10000, help="calls per latency benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per bulk benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="allowed slowdown/memory growth factor before --compare fails")
+    args = parser.parse_args()
+
+    results = bench_session_paths(args.calls, args.seed)
+    for size in args.sizes:
+        results.update(bench_history(size, args.calls, args.repeat, args.seed))
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump({
+                'machine': {'platform': platform.platform(), 'python': platform.python_version()},
+                'results': results,
+            }, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import csv
+import itertools
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_problems(n_rows, rng):
+    """Problem strings drawn like QuestionBase.get_random_problem with the default ranges."""
+    ops = rng.integers(0, 4, n_rows)
+    add1 = rng.integers(2, 101, n_rows)
+    add2 = rng.integers(2, 101, n_rows)
+    mul1 = rng.integers(2, 13, n_rows)
+    mul2 = rng.integers(2, 101, n_rows)
+
+    problems = np.empty(n_rows, dtype=object)
+    for op, symbol in enumerate(['+', '-', '*', '/']):
+        mask = ops == op
+        if symbol in '+-':
+            a, b = np.maximum(add1[mask], add2[mask]), np.minimum(add1[mask], add2[mask])
+        elif symbol == '*':
+            a, b = mul1[mask], mul2[mask]
+        else:
+            b = np.minimum(mul1[mask], mul2[mask])
+            a = b * np.maximum(mul1[mask], mul2[mask])
+        problems[mask] = [f"{x} {symbol} {y}" for x, y in zip(a.tolist(), b.tolist())]
+
+    return problems
+
+
+def synthetic_history(n_rows, rows_per_session=50, seed=0):
+    """A history frame with the same columns as the data/math_practice_*.csv files."""
+    rng = np.random.default_rng(seed)
+
+    sessions = np.arange(n_rows) // rows_per_session
+    start = np.datetime64('2025-01-01T08:00:00')
+    timestamps = pd.to_datetime(start + sessions * np.timedelta64(1, 'h')).strftime("%Y-%m-%d %H:%M:%S")
+
+    return pd.DataFrame({
+        'session_timestamp': timestamps,
+        'problem': synthetic_problems(n_rows, rng),
+        'duration_seconds': np.round(rng.gamma(2.0, 1.2, n_rows), 3),
+        'attempts': 1 + rng.poisson(0.15, n_rows),
+    })
+
+
+def write_history(data_dir, n_rows, rows_per_session=50, seed=0):
+    """Write a synthetic history to data_dir as one math_practice_*.csv per session."""
+    history = synthetic_history(n_rows, rows_per_session, seed)
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+
+    columns = list(history.columns)
+    rows = history.itertuples(index=False, name=None)
+    for start in range(0, n_rows, rows_per_session):
+        session_rows = list(itertools.islice(rows, rows_per_session))
+        timestamp = datetime.strptime(session_rows[0][0], "%Y-%m-%d %H:%M:%S")
+        file_path = os.path.join(data_dir, f"math_practice_{timestamp.strftime('%Y%m%d_%H%M%S')}.csv")
+        with open(file_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(session_rows)
+
+    return history
@@ -1,3 +1,5 @@
+from src.base import startup
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QLabel
 from src.base.settings import MathSettingsWidget
 from src.base.math_loop import MathLoopWindow
@@ -12,7 +14,8 @@ class MathSettingsWindow(QMainWindow):
     def setup_ui(self):
         """Set up the main window."""
         self.setWindowTitle("Mental Math Practice - Settings")
-        self.setFixedSize(500, 400)
+        # Grows to fit the settings form if it needs more room than this
+        self.resize(500, 400)
         
         # Create central widget
         self.settings_widget = MathSettingsWidget()
@@ -23,6 +26,7 @@ class MathSettingsWindow(QMainWindow):
     
     def start_practice(self):
         """Handle start practice button click."""
+        startup.mark('start_clicked')
         settings = self.settings_widget.get_settings()
         
         # Validate that at least one operation is selected
@@ -43,5 +47,8 @@ if __name__ == "__main__":
     
     window = MathSettingsWindow()
     window.show()
+
+    # Fires once the event loop is running, i.e. once the window can actually be drawn
+    QTimer.singleShot(0, lambda: startup.mark('settings_window'))
     
     app.exec()
\ No newline at end of file
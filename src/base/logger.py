@@ -0,0 +1,136 @@
+import atexit
+import csv
+import os
+import threading
+
+from src.base import trace
+from src.model import records
+
+
+class SessionLogger():
+    """Writes one session's answers to its CSV through a single open handle.
+
+    Rows are buffered in memory and written by a background thread every flush_interval
+    seconds, and on close() (session end) or interpreter exit, so logging never waits on disk.
+    """
+
+    HEADER = ['session_timestamp', 'problem', 'duration_seconds', 'attempts']
+    EXTENSION = '.csv'
+
+    def __init__(self, data_dir, session_start_time, flush_interval=1.0):
+        # Create data directory if it doesn't exist
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+
+        # Constant for the whole session, so it is formatted once
+        self.session_timestamp = session_start_time.strftime("%Y-%m-%d %H:%M:%S")
+
+        # Create unique filename with timestamp; sessions started in the same second get
+        # numbered suffixes, and files are created exclusively so no session truncates another
+        timestamp = session_start_time.strftime("%Y%m%d_%H%M%S")
+        number = 1
+        while True:
+            suffix = f"_{number}" if number > 1 else ""
+            session = os.path.join(data_dir, f"math_practice_{timestamp}{suffix}")
+            self.filename = session + self.EXTENSION
+            # A session's .csv and .rec share a name in the history store, so neither may exist
+            if not any(os.path.exists(session + extension) for extension in ('.csv', records.EXTENSION)):
+                try:
+                    self.open()
+                    break
+                except FileExistsError:
+                    pass
+            number += 1
+
+        self.flush_interval = flush_interval
+        # Rows logged so far, buffered or written
+        self.rows = 0
+        self.pending = []
+        self.lock = threading.Lock()
+        # Held for a whole flush, so rows reach the file in order when two threads flush
+        self.flush_lock = threading.Lock()
+        self.stop = threading.Event()
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def open(self):
+        self.file = open(self.filename, 'x', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.HEADER)
+        self.file.flush()
+
+    def write(self, entries):
+        self.writer.writerows(row for problem, row in entries)
+
+    def log(self, problem, time_taken, attempts):
+        """Queue a row for the CSV and return it with its row number in the file."""
+        row = [self.session_timestamp, str(problem), round(time_taken, 3), attempts]
+        with self.lock:
+            self.pending.append((problem, row))
+            row_number = self.rows
+            self.rows += 1
+        return row, row_number
+
+    def run(self):
+        while not self.stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                entries, self.pending = self.pending, []
+            if entries:
+                with trace.span('log_flush'):
+                    self.write(entries)
+                    self.file.flush()
+
+    def close(self):
+        """Stop the flush thread, write any buffered rows and close the file."""
+        if self.closed:
+            return
+        self.closed = True
+
+        self.stop.set()
+        self.thread.join()
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+            atexit.unregister(self.close)
+
+
+class RecordLogger(SessionLogger):
+    """SessionLogger writing the compact binary format from src.model.records instead of CSV."""
+
+    EXTENSION = records.EXTENSION
+
+    def open(self):
+        self.file = open(self.filename, 'xb')
+        self.file.write(records.header(self.session_timestamp))
+        self.file.flush()
+
+    def write(self, entries):
+        self.file.write(b''.join(
+            records.pack(problem, duration, attempts)
+            for problem, (session_timestamp, text, duration, attempts) in entries
+        ))
+
+
+class NullLogger():
+    """Same interface as SessionLogger, but keeps nothing; used for headless simulations."""
+
+    filename = None
+
+    def __init__(self, session_start_time):
+        self.session_timestamp = session_start_time.strftime("%Y-%m-%d %H:%M:%S")
+        self.rows = 0
+
+    def log(self, problem, time_taken, attempts):
+        self.rows += 1
+        return [self.session_timestamp, str(problem), round(time_taken, 3), attempts], self.rows - 1
+
+    def close(self):
+        pass
@@ -1,71 +1,150 @@
-import numpy as np
-import csv
+import math
 import os
+import statistics
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from PySide6.QtCore import QTimer, Qt
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                                QLabel, QLineEdit, QPushButton, QApplication)
 from PySide6.QtGui import QFont
 
-from src.model.utils import sample_problems
+from src.base import startup, trace
+from src.base.logger import RecordLogger, SessionLogger
+from src.base.profiles import profile_dir
+from src.base.session import Session
 
 
 # {'operations': {'addition': True, 'subtraction': True, 'multiplication': True, 'division': True},
 #  'ranges': {'addition': {'operand1': (2, 100), 'operand2': (2, 100)},
 #             'multiplication': {'operand1': (2, 12), 'operand2': (2, 12)}}}
 
+def load_model(data_dir, half_life_days=None, skills=False, operations=None, ranges=None):
+    """Import the model stack and load the weight model, or the skill model and its problem space.
+
+    Runs on a worker thread, since fitting history or building an uncached problem space
+    can take seconds. Returns (model, space); space is None for the weight model.
+    """
+    with startup.span('model_build'), trace.span('model_build'):
+        if skills:
+            from src.model.skills import load_skill_model
+            from src.model.space import ProblemSpace
+            space = ProblemSpace.load(operations, ranges, os.path.join(data_dir, 'cache'))
+            return load_skill_model(data_dir), space
+
+        from src.model.utils import load_weight_model
+        return load_weight_model(data_dir, half_life_days), None
+
 class QuestionBase():
-    def __init__(self, settings):
+    def __init__(self, settings, seed=None, data_dir="data"):
         self.operations = settings['operations']
         self.ranges = settings['ranges']
         self.dynamic = settings.get('dynamic', False)
+        # Skill mode generates new problems in weak areas instead of replaying logged ones
+        self.skills = settings.get('skills', False)
+        self.weight_model = None
+
+        # NumPy and pandas are imported here rather than at module load, so the settings
+        # window opens without them and pandas only loads (off the UI thread) in dynamic mode
+        from src.model.generator import ProblemGenerator
+
+        # Pass a seed for reproducible problem sequences in tests and benchmarks
+        self.generator = ProblemGenerator(self.operations, self.ranges, seed=seed)
 
         if self.dynamic:
-            self.problem_pool = sample_problems("data", 240)
+            # Load history and weights off the UI thread; random problems are served meanwhile
+            executor = ThreadPoolExecutor(max_workers=1)
+            self.model_future = executor.submit(load_model, data_dir, settings.get('half_life_days'), self.skills,
+                                                self.operations, self.ranges)
+            executor.shutdown(wait=False)
+            self.sampler = None
+            self.seed = seed
+            self.pending_answers = []
+        # Store writes and model catch-up run here, one at a time in answer order, so showing
+        # the next problem never waits on SQLite's write lock held by another process
+        self.writer = ThreadPoolExecutor(max_workers=1) if self.dynamic else None
 
     def get_random_problem(self):
         # Generate a math problem based on the selected operations and ranges
-        operation = np.random.choice(list(key for key in self.operations.keys() if self.operations[key]))
+        return self.generator.next_problem()
 
-        if operation in self.ranges:
-            range1 = self.ranges[operation]['operand1']
-            range2 = self.ranges[operation]['operand2']
+    def start_sampler(self):
+        """Switch to adaptive problems once the weight model has finished loading."""
+        try:
+            self.weight_model, space = self.model_future.result()
+        except Exception as e:
+            print(f"Error loading weight model: {e}")
+            self.dynamic = False
+            return
+
+        pending, self.pending_answers = self.pending_answers, []
+
+        # Problems are drawn on demand, so each one reflects the answers logged so far
+        if self.skills:
+            from src.model.skills import SkillSampler
+            self.sampler = SkillSampler(
+                self.weight_model,
+                space,
+                fallback=self.get_random_problem,
+                seed=self.seed,
+            )
         else:
-            if operation == 'subtraction':
-                range1 = self.ranges['addition']['operand1']
-                range2 = self.ranges['addition']['operand2']
-            else:
-                range1 = self.ranges['multiplication']['operand1']
-                range2 = self.ranges['multiplication']['operand2']
-
-        num1 = np.random.randint(range1[0], range1[1] + 1)
-        num2 = np.random.randint(range2[0], range2[1] + 1)
-
-        if operation == 'addition':
-            problem = f"{num1} + {num2}"
-        elif operation == 'subtraction':
-            # Ensure positive result (whole number)
-            if num1 < num2:
-                num1, num2 = num2, num1
-            problem = f"{num1} - {num2}"
-        elif operation == 'multiplication':
-            problem = f"{num1} * {num2}"
-        elif operation == 'division':
-            # Ensure no division by zero and integer result
-            # Make num1 a multiple of num2 to guarantee whole number answer
-            if num2 == 0:
-                num2 = 1
-
-            # Ensure min of two nums is the dividend
-            dividend = min(num1, num2)
-            divisor = dividend * max(num1, num2)
-            problem = f"{divisor} / {dividend}"
-
-        return problem
-    
+            from src.model.sampler import AdaptiveSampler
+            self.sampler = AdaptiveSampler(
+                self.weight_model,
+                fallback=self.get_random_problem,
+                operations=self.operations,
+                ranges=self.ranges,
+                seed=self.seed,
+            )
+        self.adaptive_problems = self.sampler.problems()
+        if pending:
+            self.queue_update(self.fold_pending_answers, pending)
+
+    def queue_update(self, function, *args):
+        """Run a model update on the writer thread, after the ones queued before it."""
+        def run():
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Error updating weight model: {e}")
+        self.writer.submit(run)
+
+    def wait_for_answers(self):
+        """Block until every queued model update has been written."""
+        if self.writer is not None:
+            self.writer.submit(lambda: None).result()
+
+    def fold_pending_answers(self, pending):
+        """Fold answers logged while the model was loading, each exactly once.
+
+        The loader's sync may already have stored, and fitted, rows the logger flushed
+        meanwhile. The store ignores a row recorded again under its (file, row) key, and
+        a skill model skips the rows of each file that its fit saw.
+        """
+        if self.skills:
+            fitted_rows = dict(self.weight_model.fitted_rows)
+            for csv_filename, row, problem, row_number in pending:
+                if csv_filename is not None:
+                    session = os.path.splitext(os.path.basename(csv_filename))[0]
+                    if fitted_rows.get(session, 0) > row_number:
+                        continue
+                self.weight_model.update(csv_filename, row, problem, row_number)
+        else:
+            for csv_filename, row, problem, row_number in pending:
+                self.weight_model.store.record_answer(csv_filename, row, row_number)
+            self.weight_model.catch_up()
+        self.sampler.refresh()
+
     def get_adaptive_problem(self):
-        return np.random.choice(self.problem_pool)
+        if self.sampler is None:
+            if not self.model_future.done():
+                return self.get_random_problem()
+            self.start_sampler()
+            if not self.dynamic:
+                return self.get_random_problem()
+        return next(self.adaptive_problems)
     
     def get_problem(self):
         if self.dynamic:
@@ -73,70 +152,57 @@ class QuestionBase():
         else:
             return self.get_random_problem()
 
+    def record_answer(self, csv_filename, row, problem, row_number=None):
+        """Queue a logged answer for the weight model; the sampler refreshes once it is folded."""
+        if not self.dynamic:
+            return
+        if self.sampler is None:
+            self.pending_answers.append((csv_filename, row, problem, row_number))
+            return
+
+        self.queue_update(self.fold_answer, csv_filename, row, problem, row_number)
+
+    def fold_answer(self, csv_filename, row, problem, row_number):
+        self.weight_model.update(csv_filename, row, problem, row_number)
+        self.sampler.refresh()
+
     def get_answer(self, problem):
-        return eval(problem)
+        return problem.answer
 
     def check_answer(self, problem, answer: int):
-        correct_answer = self.get_answer(problem)
-        return correct_answer == answer
+        # The answer is computed when the problem is made, so checking is one integer compare
+        return problem.answer == answer
 
 class MathLoopWindow(QMainWindow):
     def __init__(self, settings, parent_window=None):
         super().__init__()
         self.settings = settings
         self.parent_window = parent_window
-        self.question_base = QuestionBase(settings)
-        self.score = 0
-        self.total_questions = 0
-        self.time_remaining = 120  # 120 seconds
-        self.current_problem = ""
-        
-        # Statistics tracking variables
-        self.problem_start_time = None
-        self.attempts_for_current_problem = 0
-        self.session_start_time = datetime.now()
+        # Each profile logs to, and learns from, its own history
+        self.data_dir = profile_dir(settings.get('profile'))
+        self.question_base = QuestionBase(settings, data_dir=self.data_dir)
+        # Accept a correct answer as soon as it is typed, Zetamac style; Enter still submits
+        self.auto_advance = settings.get('auto_advance', True)
         
-        # Initialize CSV file for statistics
-        self.setup_csv_logging()
+        # Session engine and CSV file for statistics
+        self.setup_session()
         
         self.setup_ui()
         self.setup_timer()
         self.new_problem()
+        startup.mark('first_problem')
     
-    def setup_csv_logging(self):
-        """Initialize CSV file for logging statistics."""
-        # Create data directory if it doesn't exist
-        data_dir = "data"
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-        
-        # Create unique filename with timestamp
-        timestamp = self.session_start_time.strftime("%Y%m%d_%H%M%S")
-        self.csv_filename = os.path.join(data_dir, f"math_practice_{timestamp}.csv")
-        
-        # Create CSV file with headers
-        with open(self.csv_filename, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                'session_timestamp',
-                'problem',
-                'duration_seconds',
-                'attempts',
-            ])
-    
-    def log_question_stats(self, problem, time_taken, attempts):
-        """Log statistics for a question to CSV."""
-        try:            
-            with open(self.csv_filename, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    self.session_start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    problem,
-                    round(time_taken, 3),
-                    attempts,
-                ])
-        except Exception as e:
-            print(f"Error logging to CSV: {e}")
+    def setup_session(self):
+        """Start a session engine logging to a new CSV file."""
+        self.session_start_time = datetime.now()
+        # settings['log_format'] = 'records' selects the compact binary log instead of CSV
+        logger_class = RecordLogger if self.settings.get('log_format') == 'records' else SessionLogger
+        self.logger = logger_class(self.data_dir, self.session_start_time)
+        self.csv_filename = self.logger.filename
+        self.session = Session(self.question_base, self.logger)
+        # Nanoseconds from a matching keystroke to the next problem being on screen
+        self.advance_latencies = []
+        self.tick_jitter = []
     
     def setup_ui(self):
         """Set up the user interface."""
@@ -151,7 +217,7 @@ class MathLoopWindow(QMainWindow):
         # Timer and score display
         top_layout = QHBoxLayout()
         
-        self.timer_label = QLabel(f"{self.time_remaining}")
+        self.timer_label = QLabel(f"{self.session.time_remaining}")
         self.timer_label.setFont(QFont("Arial", 16, QFont.Bold))
         self.timer_label.setStyleSheet("color: #2196F3; padding: 10px;")
         top_layout.addWidget(self.timer_label)
@@ -201,9 +267,17 @@ class MathLoopWindow(QMainWindow):
             }
         """)
         self.answer_input.returnPressed.connect(self.submit_answer)
+        self.answer_input.textChanged.connect(self.check_typed_answer)
         answer_layout.addWidget(self.answer_input)
         
         layout.addLayout(answer_layout)
+
+        # Input-to-next-problem latency of the last auto-advance
+        self.latency_label = QLabel("")
+        self.latency_label.setFont(QFont("Arial", 10))
+        self.latency_label.setAlignment(Qt.AlignRight)
+        self.latency_label.setStyleSheet("color: #9e9e9e; padding: 0px 10px;")
+        layout.addWidget(self.latency_label)
         
         # Feedback label
         self.feedback_label = QLabel("")
@@ -276,72 +350,101 @@ class MathLoopWindow(QMainWindow):
         layout.addStretch()
     
     def setup_timer(self):
-        """Set up the countdown timer."""
-        self.timer = QTimer()
+        """Create the window's timers once; sessions restart them rather than making new ones."""
+        # The countdown is re-armed after every tick for the moment the displayed second
+        # changes, so late ticks never add up and the last one lands on the session deadline
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.update_timer)
-        self.timer.start(1000)  # Update every second
-    
+
+        # Refills the session's queue of ready problems once pending events are handled,
+        # so the next problem is drawn between keystrokes rather than after a correct answer
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(0)
+        self.prefetch_timer.timeout.connect(self.prefetch_problems)
+
+        self.schedule_tick()
+
+    def schedule_tick(self):
+        left = self.session.seconds_left()
+        delay = min(left - math.floor(left) or 1.0, left)
+        self.next_tick_at = self.session.clock.now() + delay
+        # Rounded up so a tick never arrives before the second it is meant to show
+        self.timer.start(math.ceil(delay * 1000))
+
     def update_timer(self):
         """Update the timer display and check if time is up."""
-        self.time_remaining -= 1
-        self.timer_label.setText(f"{self.time_remaining}")
+        # How late this tick fired, in seconds
+        self.tick_jitter.append(self.session.clock.now() - self.next_tick_at)
+        time_up = self.session.tick()
+        self.timer_label.setText(f"{self.session.time_remaining}")
     
-        if self.time_remaining <= 0:
+        if time_up:
             self.end_session()
+        else:
+            self.schedule_tick()
     
     def new_problem(self):
         """Generate and display a new math problem."""
-        self.current_problem = self.question_base.get_problem()
-        self.problem_label.setText(self.current_problem)
+        self.session.next_problem()
+        self.show_problem()
+    
+    def show_problem(self):
+        """Display the session's current problem and reset the input."""
+        self.problem_label.setText(self.session.problem_text)
         self.answer_input.clear()
         self.answer_input.setFocus()
         self.feedback_label.clear()
-        
-        # Start timing for this problem
-        self.problem_start_time = time.time()
-        self.attempts_for_current_problem = 0
+        self.prefetch_timer.start()
+
+    def prefetch_problems(self):
+        if not self.session.is_over():
+            with trace.span('prefetch'):
+                self.session.prefetch()
     
     def submit_answer(self):
         """Check the submitted answer and update score."""
-        if self.time_remaining <= 0:
+        if self.session.is_over():
             return
             
         try:
             user_answer = int(self.answer_input.text())
-            self.attempts_for_current_problem += 1
-            
-            # Calculate time taken for this problem
-            time_taken = time.time() - self.problem_start_time if self.problem_start_time else 0
-            
-            is_correct = self.question_base.check_answer(self.current_problem, user_answer)
-            
-            if is_correct:
-                self.total_questions += 1
-                self.score += 1
-                
-                # Log statistics to CSV
-                self.log_question_stats(
-                    self.current_problem,
-                    round(time_taken, 3),
-                    self.attempts_for_current_problem
-                )
-                
-                self.update_score_display()
-                
-                self.new_problem()
-                
         except ValueError:
             self.feedback_label.setText("Please enter a valid number")
             self.feedback_label.setStyleSheet("color: #ff9800; padding: 10px;")
+            return
+
+        # A correct answer is logged and the session moves on to the next problem
+        if self.session.submit(user_answer):
+            with trace.span('ui_update'):
+                self.update_score_display()
+                self.show_problem()
     
+    def check_typed_answer(self, text):
+        """Advance the moment the typed text matches the answer, without waiting for Enter."""
+        if not self.auto_advance or not self.session.accepts(text):
+            return
+
+        start = time.perf_counter_ns()
+        if self.session.submit(self.session.current_problem.answer):
+            with trace.span('ui_update'):
+                self.update_score_display()
+                self.show_problem()
+            latency = time.perf_counter_ns() - start
+            self.advance_latencies.append(latency)
+            self.latency_label.setText(f"{latency / 1e6:.2f} ms")
+
     def update_score_display(self):
         """Update the score display."""
-        accuracy = (self.score / self.total_questions * 100) if self.total_questions > 0 else 0
-        self.score_label.setText(f"{self.score}")
+        self.score_label.setText(f"{self.session.score}")
     
     def end_session(self):
         """End the math session and show results."""
         self.timer.stop()
+        self.prefetch_timer.stop()
+        self.session.close()
         
         # Hide input elements
         self.answer_input.hide()
@@ -349,28 +452,34 @@ class MathLoopWindow(QMainWindow):
         self.problem_label.hide()
         
         # Show results
-        accuracy = (self.score / self.total_questions * 100) if self.total_questions > 0 else 0
         results_text = f"""
         🎉 Session Complete! 🎉
         
-        Final Score: {self.score}
+        Final Score: {self.session.score}
+        Accuracy: {self.session.accuracy():.0f}%
         """
-        
+        if self.advance_latencies:
+            latencies = sorted(self.advance_latencies)
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            results_text += (f"\nNext problem after typing: median {statistics.median(latencies) / 1e6:.2f} ms,"
+                             f" p99 {p99 / 1e6:.2f} ms\n")
+        if self.tick_jitter:
+            results_text += (f"Timer ticks late by: median {statistics.median(self.tick_jitter) * 1000:.1f} ms,"
+                             f" max {max(self.tick_jitter) * 1000:.1f} ms\n")
+        
+        if trace.enabled:
+            print(trace.format_summary(), file=sys.stderr)
+            print(f"Trace written to {trace.export_chrome()}", file=sys.stderr)
+
         self.results_label.setText(results_text)
         self.results_label.show()
         self.button_widget.show()
     
     def restart_session(self):
         """Restart the math session."""
-        self.score = 0
-        self.total_questions = 0
-        self.time_remaining = 120
-        
-        # Reset statistics tracking for new session
-        self.session_start_time = datetime.now()
-        self.problem_start_time = None
-        self.attempts_for_current_problem = 0
-        self.setup_csv_logging()  # Create new CSV file for new session
+        self.session.close()
+        trace.reset()  # Each session's trace summary and file cover that session only
+        self.setup_session()  # Fresh scores, timer and CSV file for the new session
         
         # Show input elements
         self.answer_input.show()
@@ -380,17 +489,25 @@ class MathLoopWindow(QMainWindow):
         
         # Hide results
         self.results_label.hide()
+        self.latency_label.clear()
         self.button_widget.hide()
         
         # Reset displays
-        self.timer_label.setText(f"{self.time_remaining}")
+        self.timer_label.setText(f"{self.session.time_remaining}")
         self.timer_label.setStyleSheet("color: #2196F3; padding: 10px;")
-        self.score_label.setText(f"{self.score}")
+        self.score_label.setText(f"{self.session.score}")
 
         # Start timer and new problem
-        self.setup_timer()
+        self.schedule_tick()
         self.new_problem()
 
+    def closeEvent(self, event):
+        """Write out buffered answers if the window is closed mid-session."""
+        self.timer.stop()
+        self.prefetch_timer.stop()
+        self.session.close()
+        super().closeEvent(event)
+
     def back_to_settings(self):
         self.close()
         if self.parent_window:
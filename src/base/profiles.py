@@ -0,0 +1,20 @@
+"""Where each profile's session logs and history store live.
+
+The default profile keeps the top-level data directory; named profiles get their own
+directory under data/profiles/, so people sharing a machine never share an adaptive model.
+Set ZETAMAC_DATA to move the data directory.
+"""
+import os
+import re
+
+DATA_ROOT = os.environ.get('ZETAMAC_DATA', 'data')
+
+
+def profile_dir(profile=None, root=None):
+    root = root or DATA_ROOT
+    if not profile or not profile.strip():
+        return root
+
+    # Profile names become directory names: keep them to one safe path component
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', profile.strip())
+    return os.path.join(root, 'profiles', name)
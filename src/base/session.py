@@ -0,0 +1,191 @@
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+from src.base import trace
+from src.base.logger import NullLogger
+
+SESSION_SECONDS = 120
+# Problems kept ready ahead of the current one
+PREFETCH = 4
+
+
+class WallClock():
+    """Monotonic seconds: unaffected by system clock changes, so durations and deadlines hold."""
+
+    def now(self):
+        return time.monotonic()
+
+
+class SimulatedClock():
+    """A clock that only moves when told to, so simulated sessions run at full speed."""
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance_to(self, when):
+        self.time = when
+
+
+class Session():
+    """Timer, scoring, attempts, per-problem timing and logging for one practice session.
+
+    Has no Qt dependency: MathLoopWindow drives it from a QTimer and its answer box, and
+    run_headless drives it from a SimulatedClock and a SimulatedSolver. The session ends at
+    a fixed deadline on its clock, however late the display ticks arrive.
+    """
+
+    def __init__(self, question_base, logger=None, duration=SESSION_SECONDS, clock=None, prefetch=PREFETCH):
+        self.question_base = question_base
+        self.logger = logger if logger is not None else NullLogger(datetime.now())
+        self.clock = clock if clock is not None else WallClock()
+
+        self.score = 0
+        self.total_questions = 0
+        # Every answer submitted, right or wrong
+        self.total_attempts = 0
+        self.deadline = self.clock.now() + duration
+        # Whole seconds left as last displayed; refreshed by tick()
+        self.time_remaining = duration
+        self.current_problem = None
+        # The problem as displayed and the answer as the player would type it, so showing a
+        # problem is a label swap and typed text is checked with one string compare
+        self.problem_text = None
+        self.answer_text = None
+
+        # (problem, problem_text, answer_text) drawn ahead of time by prefetch()
+        self.prefetch_size = prefetch
+        self.upcoming = deque()
+
+        # Statistics tracking variables
+        self.problem_start_time = None
+        self.attempts_for_current_problem = 0
+
+    def seconds_left(self):
+        return max(self.deadline - self.clock.now(), 0.0)
+
+    def is_over(self):
+        return self.clock.now() >= self.deadline
+
+    def tick(self):
+        """Refresh time_remaining from the deadline; returns True once time is up."""
+        self.time_remaining = math.ceil(self.seconds_left())
+        return self.is_over()
+
+    def next_problem(self):
+        """Take the next problem, from the prefetched queue when it has one, and start timing it."""
+        if self.upcoming:
+            self.current_problem, self.problem_text, self.answer_text = self.upcoming.popleft()
+        else:
+            self.current_problem, self.problem_text, self.answer_text = self.prepare()
+        self.problem_start_time = self.clock.now()
+        self.attempts_for_current_problem = 0
+        return self.current_problem
+
+    def prepare(self):
+        with trace.span('generate'):
+            problem = self.question_base.get_problem()
+            return problem, str(problem), str(problem.answer)
+
+    def prefetch(self):
+        """Top the queue of ready problems up to prefetch_size, rendering their text too.
+
+        Meant for idle time between answers. Adaptive problems are drawn up to prefetch_size
+        answers early, so the newest answers reach them that much later.
+        """
+        while len(self.upcoming) < self.prefetch_size:
+            self.upcoming.append(self.prepare())
+
+    def accepts(self, text):
+        """Whether typed text is exactly the current answer (no parsing, no attempt counted)."""
+        return text == self.answer_text and not self.is_over()
+
+    def submit(self, user_answer):
+        """Check an answer; a correct one is logged and replaced by the next problem."""
+        if self.is_over():
+            return False
+
+        self.attempts_for_current_problem += 1
+        self.total_attempts += 1
+
+        # Calculate time taken for this problem
+        time_taken = self.clock.now() - self.problem_start_time if self.problem_start_time is not None else 0
+
+        with trace.span('check'):
+            correct = self.question_base.check_answer(self.current_problem, user_answer)
+        if not correct:
+            return False
+
+        self.total_questions += 1
+        self.score += 1
+        self.log_question_stats(self.current_problem, round(time_taken, 3), self.attempts_for_current_problem)
+        self.next_problem()
+        return True
+
+    def accuracy(self):
+        """Share of submitted answers that were right, in percent."""
+        return self.score / self.total_attempts * 100 if self.total_attempts else 0
+
+    def log_question_stats(self, problem, time_taken, attempts):
+        """Log statistics for a question to CSV."""
+        try:
+            with trace.span('log'):
+                row, row_number = self.logger.log(problem, time_taken, attempts)
+        except Exception as e:
+            print(f"Error logging to CSV: {e}")
+            return
+
+        # Keep the persisted weight model current without re-reading history
+        try:
+            with trace.span('model_update'):
+                self.question_base.record_answer(self.logger.filename, row, problem, row_number)
+        except Exception as e:
+            print(f"Error updating weight model: {e}")
+
+    def close(self):
+        self.logger.close()
+
+
+class SimulatedSolver():
+    """Answers like a player: slower on longer answers, with the occasional wrong attempt."""
+
+    def __init__(self, seed=None, base_seconds=0.8, seconds_per_digit=0.4, error_rate=0.05):
+        self.rng = random.Random(seed)
+        self.base_seconds = base_seconds
+        self.seconds_per_digit = seconds_per_digit
+        self.error_rate = error_rate
+
+    def attempt(self, problem):
+        """Return (seconds spent, answer given) for one attempt at a problem."""
+        digits = len(str(problem.answer))
+        seconds = (self.base_seconds + self.seconds_per_digit * digits) * self.rng.uniform(0.5, 1.5)
+        if self.rng.random() < self.error_rate:
+            return seconds, problem.answer + 1
+        return seconds, problem.answer
+
+
+def run_headless(session, solver):
+    """Play a session to the end on its SimulatedClock and return the final score."""
+    clock = session.clock
+    session.next_problem()
+
+    while not session.is_over():
+        seconds, answer = solver.attempt(session.current_problem)
+        answered_at = clock.now() + seconds
+
+        # An answer that would arrive after the deadline is never given
+        if answered_at >= session.deadline:
+            clock.advance_to(session.deadline)
+            session.tick()
+            break
+
+        clock.advance_to(answered_at)
+        session.submit(answer)
+
+    session.close()
+    return session.score
@@ -27,11 +27,41 @@ class MathSettingsWidget(QWidget):
         
         main_layout.addWidget(operations_group)
 
+        # Profile: each one keeps its own history and adaptive model
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Profile:"))
+        self.profile_edit = QLineEdit()
+        self.profile_edit.setPlaceholderText("default")
+        profile_layout.addWidget(self.profile_edit)
+        main_layout.addLayout(profile_layout)
+
         # Difficulty selection group
         self.dynamic_checkbox = QCheckBox("Enable Dynamic Difficulty")
         self.dynamic_checkbox.setChecked(True)
         main_layout.addWidget(self.dynamic_checkbox)
 
+        self.skills_checkbox = QCheckBox("Generate New Problems in Weak Areas")
+        self.skills_checkbox.setChecked(False)
+        self.dynamic_checkbox.toggled.connect(self.skills_checkbox.setEnabled)
+        main_layout.addWidget(self.skills_checkbox)
+
+        # Time decay for the per-problem model: an answer's weight halves every this many days
+        half_life_layout = QHBoxLayout()
+        half_life_layout.addWidget(QLabel("Half-Life of Past Answers (days):"))
+        self.half_life_edit = QLineEdit()
+        self.half_life_edit.setPlaceholderText("never fade")
+        half_life_layout.addWidget(self.half_life_edit)
+        main_layout.addLayout(half_life_layout)
+
+        self.auto_advance_checkbox = QCheckBox("Advance As Soon As the Answer Is Typed")
+        self.auto_advance_checkbox.setChecked(True)
+        main_layout.addWidget(self.auto_advance_checkbox)
+
+        # Binary .rec logs are smaller and load without parsing; see src.model.records
+        self.records_checkbox = QCheckBox("Log Sessions in Compact Binary Format")
+        self.records_checkbox.setChecked(False)
+        main_layout.addWidget(self.records_checkbox)
+
         # Start button
         self.start_button = QPushButton("Start Practice")
         self.start_button.setStyleSheet("""
@@ -151,6 +181,13 @@ class MathSettingsWidget(QWidget):
             lambda checked: self.multiplication_range_widget.setEnabled(checked)
         )
         
+        # Skill mode keeps no per-problem history to fade
+        for checkbox in [self.dynamic_checkbox, self.skills_checkbox]:
+            checkbox.toggled.connect(
+                lambda checked: self.half_life_edit.setEnabled(
+                    self.dynamic_checkbox.isChecked() and not self.skills_checkbox.isChecked())
+            )
+        
         # Update start button state when checkboxes change
         for checkbox in [self.addition_checkbox, self.subtraction_checkbox, 
                         self.multiplication_checkbox, self.division_checkbox]:
@@ -201,6 +238,15 @@ class MathSettingsWidget(QWidget):
             settings['dynamic'] = True
         else:
             settings['dynamic'] = False
+        settings['skills'] = self.skills_checkbox.isChecked()
+        settings['auto_advance'] = self.auto_advance_checkbox.isChecked()
+        settings['profile'] = self.profile_edit.text().strip() or None
+        try:
+            half_life_days = float(self.half_life_edit.text())
+        except ValueError:
+            half_life_days = None
+        settings['half_life_days'] = half_life_days if half_life_days and half_life_days > 0 else None
+        settings['log_format'] = 'records' if self.records_checkbox.isChecked() else 'csv'
 
         return settings
 
@@ -0,0 +1,38 @@
+"""Startup milestones, measured from the moment this module is first imported.
+
+Import it before anything heavy (gui.py does so first). Set ZETAMAC_STARTUP_TIMING=1
+to print each milestone to stderr as it is reached.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+START = time.perf_counter()
+VERBOSE = bool(os.environ.get('ZETAMAC_STARTUP_TIMING'))
+
+# {milestone: seconds since START}; only the first occurrence of each milestone is kept
+marks = {}
+
+
+def mark(name):
+    if name in marks:
+        return
+    marks[name] = time.perf_counter() - START
+    if VERBOSE:
+        print(f"[startup] {name}: {marks[name] * 1000:.1f} ms", file=sys.stderr)
+
+
+@contextmanager
+def span(name):
+    """Record how long a block takes as the milestone '<name>_seconds'."""
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - begin
+        key = f"{name}_seconds"
+        if key not in marks:
+            marks[key] = duration
+            if VERBOSE:
+                print(f"[startup] {name} took {duration * 1000:.1f} ms", file=sys.stderr)
@@ -0,0 +1,99 @@
+"""Opt-in timing spans for the session hot paths, recorded with perf_counter_ns.
+
+Set ZETAMAC_TRACE=trace.json (or call enable()) to record spans for problem generation,
+answer checks, logging, model updates and builds, and UI updates. end_session prints a
+per-span summary and writes the spans to that path as Chrome trace JSON (load it in
+chrome://tracing or https://ui.perfetto.dev). When tracing is off, span() returns one
+shared no-op context manager and nothing is recorded.
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from contextlib import nullcontext
+
+path = os.environ.get('ZETAMAC_TRACE') or None
+enabled = path is not None
+
+# (name, start ns, duration ns, thread id); list.append is atomic, so worker threads may record
+events = []
+
+NULL_SPAN = nullcontext()
+
+
+class Span():
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        events.append((self.name, self.start, time.perf_counter_ns() - self.start, threading.get_ident()))
+        return False
+
+
+def span(name):
+    """Time a block as one event named name; free of bookkeeping when tracing is off."""
+    if not enabled:
+        return NULL_SPAN
+    return Span(name)
+
+
+def enable(trace_path=None):
+    global enabled, path
+    enabled = True
+    path = trace_path or path
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    events.clear()
+
+
+def summary():
+    """Return {name: {'count', 'total_ms', 'p50_us', 'p99_us', 'max_us'}} over recorded spans."""
+    durations = {}
+    for name, start, duration, thread in list(events):
+        durations.setdefault(name, []).append(duration)
+
+    result = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        result[name] = {
+            'count': len(values),
+            'total_ms': sum(values) / 1e6,
+            'p50_us': statistics.median(values) / 1e3,
+            'p99_us': values[min(len(values) - 1, int(len(values) * 0.99))] / 1e3,
+            'max_us': values[-1] / 1e3,
+        }
+    return result
+
+
+def format_summary():
+    lines = [f"{'span':<16} {'count':>7} {'total ms':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+    for name, stats in summary().items():
+        lines.append(f"{name:<16} {stats['count']:>7} {stats['total_ms']:>10.2f} {stats['p50_us']:>9.1f}"
+                     f" {stats['p99_us']:>9.1f} {stats['max_us']:>9.1f}")
+    return "\n".join(lines)
+
+
+def export_chrome(trace_path=None):
+    """Write recorded spans as Chrome trace 'complete' events and return the path written."""
+    trace_path = trace_path or path
+    pid = os.getpid()
+    trace_events = [
+        {'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': pid, 'tid': thread}
+        for name, start, duration, thread in list(events)
+    ]
+    with open(trace_path, 'w', encoding='utf-8') as file:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ns'}, file)
+    return trace_path
@@ -0,0 +1,69 @@
+import numpy as np
+
+from src.model.problem import DEFAULT_RANGES, OPERATIONS, Problem, operand_ranges
+
+
+class ProblemGenerator():
+    """Draws random problems in vectorized blocks and serves them one at a time.
+
+    Follows the same rules as the original per-call generator: subtraction swaps operands
+    so the result is non-negative, and division is built from a product so it divides evenly.
+    """
+
+    def __init__(self, operations, ranges, block_size=4096, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        self.enabled = [op for op in OPERATIONS if operations.get(op)]
+        if not self.enabled:
+            raise ValueError("at least one operation must be enabled")
+
+        self.bounds = {
+            op: operand_ranges(op, ranges) or operand_ranges(op, DEFAULT_RANGES)
+            for op in self.enabled
+        }
+
+        self.buffer = []
+        self.position = 0
+
+    def next_problem(self):
+        if self.position >= len(self.buffer):
+            self.refill()
+        problem = self.buffer[self.position]
+        self.position += 1
+        return problem
+
+    def refill(self):
+        """Draw the next block of problems in a handful of array operations."""
+        n = self.block_size
+        codes = self.rng.integers(len(self.enabled), size=n)
+        problems = [None] * n
+
+        for code, op in enumerate(self.enabled):
+            positions = np.flatnonzero(codes == code)
+            (lo1, hi1), (lo2, hi2) = self.bounds[op]
+            num1 = self.rng.integers(lo1, hi1 + 1, size=len(positions))
+            num2 = self.rng.integers(lo2, hi2 + 1, size=len(positions))
+
+            a, b, answer = from_draws(op, num1, num2)
+
+            for i, x, y, z in zip(positions.tolist(), a.tolist(), b.tolist(), answer.tolist()):
+                problems[i] = Problem(op, x, y, z)
+
+        self.buffer = problems
+        self.position = 0
+
+
+def from_draws(op, num1, num2):
+    """Turn arrays of drawn operands into (a, b, answer) arrays for one operation."""
+    if op == 'addition':
+        return num1, num2, num1 + num2
+    if op == 'subtraction':
+        # Ensure positive result (whole number)
+        a, b = np.maximum(num1, num2), np.minimum(num1, num2)
+        return a, b, a - b
+    if op == 'multiplication':
+        return num1, num2, num1 * num2
+    # Make the dividend a multiple of the smaller operand so the answer is whole
+    num2 = np.where(num2 == 0, 1, num2)
+    b, answer = np.minimum(num1, num2), np.maximum(num1, num2)
+    return b * answer, b, answer
@@ -0,0 +1,41 @@
+import argparse
+
+from src.model.store import EMPTY_LOG_MIN_AGE, HistoryStore
+from src.model.utils import EMA_SPAN, compact_history
+
+
+def remove_empty_logs(data_dir, min_age=EMPTY_LOG_MIN_AGE):
+    """Delete header-only session logs older than min_age seconds; returns their paths."""
+    store = HistoryStore(data_dir)
+    try:
+        return store.remove_empty_logs(min_age)
+    finally:
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean up and compact the practice history")
+    parser.add_argument('data_dir')
+    parser.add_argument('--remove-empty', action='store_true',
+                        help="delete session logs that hold only a header")
+    parser.add_argument('--min-age', type=float, default=EMPTY_LOG_MIN_AGE,
+                        help="seconds since an empty log was last written before it may be deleted")
+    parser.add_argument('--keep-sessions', type=int, help="compact answers older than the last N sessions")
+    parser.add_argument('--keep-days', type=float, help="compact answers older than N days")
+    parser.add_argument('--span', type=int, default=EMA_SPAN)
+    parser.add_argument('--half-life-days', type=float,
+                        help="decay used by the adaptive model, so summaries match it")
+    args = parser.parse_args()
+
+    if args.remove_empty:
+        for file_path in remove_empty_logs(args.data_dir, args.min_age):
+            print(f"removed {file_path}")
+
+    if args.keep_sessions is not None or args.keep_days is not None:
+        removed = compact_history(args.data_dir, args.keep_sessions, args.keep_days,
+                                  args.span, args.half_life_days)
+        print(f"compacted {removed} answers into per-problem summaries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from typing import NamedTuple
+
+OPERATIONS = ('addition', 'subtraction', 'multiplication', 'division')
+SYMBOLS = {'+': 'addition', '-': 'subtraction', '*': 'multiplication', '/': 'division'}
+OPERATION_SYMBOLS = {op: symbol for symbol, op in SYMBOLS.items()}
+
+# Subtraction and division reuse the addition and multiplication ranges in reverse,
+# and the generator may swap their operands, so either operand can come from either range
+RANGE_SOURCE = {
+    'addition': 'addition',
+    'subtraction': 'addition',
+    'multiplication': 'multiplication',
+    'division': 'multiplication',
+}
+REVERSED = ('subtraction', 'division')
+
+# Same defaults as the settings window, used when an operation's source range is missing
+DEFAULT_RANGES = {
+    'addition': {'operand1': (2, 100), 'operand2': (2, 100)},
+    'multiplication': {'operand1': (2, 12), 'operand2': (2, 100)},
+}
+
+
+class Problem(NamedTuple):
+    """A problem as an operation code, its displayed operands and the precomputed integer answer."""
+    op: str
+    a: int
+    b: int
+    answer: int
+
+    @classmethod
+    def from_operands(cls, op, a, b):
+        if op == 'addition':
+            answer = a + b
+        elif op == 'subtraction':
+            answer = a - b
+        elif op == 'multiplication':
+            answer = a * b
+        else:
+            answer = a // b
+        return cls(op, a, b, answer)
+
+    @classmethod
+    def from_text(cls, text):
+        return cls.from_operands(*parse_problem(text))
+
+    def __str__(self):
+        return f"{self.a} {OPERATION_SYMBOLS[self.op]} {self.b}"
+
+
+def parse_problem(text):
+    """Split a problem string such as "650 / 10" into ('division', 650, 10)."""
+    a, symbol, b = str(text).split()
+    return SYMBOLS[symbol], int(a), int(b)
+
+
+def drawn_operands(op, a, b):
+    """The two operands the generator drew to produce a problem; smaller first for reversed ops."""
+    if op == 'subtraction':
+        return min(a, b), max(a, b)
+    if op == 'division':
+        quotient = a // b if b else 0
+        return min(b, quotient), max(b, quotient)
+    return a, b
+
+
+def operand_ranges(op, ranges):
+    """Return (operand1, operand2) bounds for an operation, or None when it is unrestricted."""
+    source = ranges.get(RANGE_SOURCE[op])
+    if source is None:
+        return None
+    return source['operand1'], source['operand2']
+
+
+def in_ranges(op, a, b, ranges):
+    """Whether get_random_problem could have produced this problem under the given ranges."""
+    bounds = operand_ranges(op, ranges)
+    if bounds is None:
+        return True
+
+    (lo1, hi1), (lo2, hi2) = bounds
+    x, y = drawn_operands(op, a, b)
+    if lo1 <= x <= hi1 and lo2 <= y <= hi2:
+        return True
+    return op in REVERSED and lo1 <= y <= hi1 and lo2 <= x <= hi2
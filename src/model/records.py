@@ -0,0 +1,138 @@
+"""Fixed-width binary session logs (math_practice_*.rec).
+
+A 64-byte header (magic, session timestamp) followed by one 15-byte little-endian record
+per answer: operation code (index into OPERATIONS), attempts (two bytes), both displayed
+operands and the duration as float32. Files can be appended to a record at a time, and are
+decoded column by column from a NumPy memmap rather than parsed line by line; the history
+store still turns them into rows to ingest. Files written with a one-byte attempts field
+(ZMREC001) are still read.
+
+Convert existing CSV sessions with:
+
+    python -m src.model.records data/
+"""
+import argparse
+import csv
+import os
+import struct
+import sys
+
+from src.model.problem import OPERATIONS, Problem, parse_problem
+
+EXTENSION = '.rec'
+MAGIC = b'ZMREC002'
+# Attempts field type under each magic
+ATTEMPTS_TYPES = {b'ZMREC001': 'u1', MAGIC: '<u2'}
+HEADER_SIZE = 64
+RECORD = struct.Struct('<BHiif')
+OP_CODES = {op: code for code, op in enumerate(OPERATIONS)}
+
+
+def record_dtype(magic=MAGIC):
+    # NumPy is only needed to read records back, so it is imported on first use
+    import numpy as np
+
+    return np.dtype([('op', 'u1'), ('attempts', ATTEMPTS_TYPES[magic]), ('a', '<i4'), ('b', '<i4'),
+                     ('duration', '<f4')])
+
+
+def header(session_timestamp):
+    """The fixed-size file header for a session started at session_timestamp."""
+    return MAGIC + session_timestamp.encode('ascii').ljust(HEADER_SIZE - len(MAGIC), b'\0')
+
+
+def pack(problem, duration, attempts):
+    """One answer as a record; raises struct.error for values the record cannot hold."""
+    return RECORD.pack(OP_CODES[problem.op], attempts, problem.a, problem.b, duration)
+
+
+def open_records(file_path):
+    """Return (session_timestamp, records) with records memory-mapped read-only.
+
+    A partially written trailing record is ignored.
+    """
+    import numpy as np
+
+    with open(file_path, 'rb') as file:
+        raw_header = file.read(HEADER_SIZE)
+    magic = raw_header[:len(MAGIC)]
+    if len(raw_header) < HEADER_SIZE or magic not in ATTEMPTS_TYPES:
+        raise ValueError(f"{file_path} is not a session record file")
+    session_timestamp = raw_header[len(MAGIC):].rstrip(b'\0').decode('ascii')
+
+    dtype = record_dtype(magic)
+    count = (os.path.getsize(file_path) - HEADER_SIZE) // dtype.itemsize
+    if count == 0:
+        return session_timestamp, np.empty(0, dtype=dtype)
+    return session_timestamp, np.memmap(file_path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def read_rows(file_path, start=0):
+    """Records from index start on, as (session_timestamp, problem, duration_seconds, attempts)."""
+    session_timestamp, records = open_records(file_path)
+    records = records[start:]
+    return [
+        (session_timestamp, str(Problem.from_operands(OPERATIONS[op], a, b)), round(duration, 3), attempts)
+        for op, attempts, a, b, duration in zip(
+            records['op'].tolist(), records['attempts'].tolist(), records['a'].tolist(),
+            records['b'].tolist(), records['duration'].tolist())
+    ]
+
+
+def convert_csv(csv_path, remove=False):
+    """Write a .rec copy of a session CSV and return its path.
+
+    Raises ValueError, leaving no .rec behind, if a row cannot be stored as a record: the
+    store prefers a session's .rec over its CSV, so a partial copy would lose rows.
+    """
+    record_path = csv_path[:-len('.csv')] + EXTENSION
+    with open(csv_path, newline='', encoding='utf-8') as source:
+        reader = csv.reader(source)
+        next(reader, None)  # Skip header
+        rows = [row for row in reader if len(row) == 4]
+
+    records = []
+    for line, (session_timestamp, text, duration, attempts) in enumerate(rows, start=2):
+        try:
+            records.append(pack(Problem.from_operands(*parse_problem(text)), float(duration), int(attempts)))
+        except (ValueError, KeyError, struct.error) as e:
+            raise ValueError(f"{csv_path}: row {line} ({text!r}) cannot be stored as a record: {e}") from e
+
+    # Written under a temporary name and renamed, so the .rec appears complete or not at all
+    temporary_path = f"{record_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, 'wb') as target:
+            target.write(header(rows[0][0] if rows else ''))
+            target.write(b''.join(records))
+        os.replace(temporary_path, record_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+    if remove:
+        os.remove(csv_path)
+    return record_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert session CSVs to .rec files")
+    parser.add_argument('data_dir')
+    parser.add_argument('--remove', action='store_true', help="delete each CSV after converting it")
+    args = parser.parse_args()
+
+    failed = 0
+    for file_name in sorted(os.listdir(args.data_dir)):
+        if file_name.startswith('math_practice_') and file_name.endswith('.csv'):
+            try:
+                print(convert_csv(os.path.join(args.data_dir, file_name), args.remove))
+            except (OSError, ValueError) as e:
+                # The CSV is left in place, so its session stays in history unconverted
+                print(f"skipped {e}", file=sys.stderr)
+                failed += 1
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Replay stored history through the adaptive model and score its predictions.
+
+Every answer is predicted from the EMA state its problem had before it, and predictions
+are scored against the time the answer actually took. A sweep tries every combination of
+span, weighting formula and decay half-life on a process pool; workers share one
+memory-mapped copy of the history arrays rather than each loading the store.
+
+    python -m src.model.replay data/ --spans 3 5 10 20 --half-lives none 7 30
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.model.store import SUMMARY_COLUMNS, HistoryStore
+from src.model.utils import EMA_SPAN, timestamp_days
+
+# Per-answer value folded into the EMA, from (duration_seconds, attempts) arrays;
+# duration_x_attempts is what model() and WeightModel use
+WEIGHTINGS = {
+    'duration': lambda duration, attempts: duration,
+    'duration_x_attempts': lambda duration, attempts: duration * attempts,
+    'duration_x_sqrt_attempts': lambda duration, attempts: duration * np.sqrt(attempts),
+}
+REPLAY_ARRAYS = ('problems', 'duration', 'attempts', 'days', 'scored', 'order', 'blocks')
+
+# Arrays of the history being replayed, memory-mapped once per worker process
+shared = {}
+
+
+def prepare(data, directory):
+    """Write the replay arrays for a chronological answers frame to directory as .npy files.
+
+    Rows are also ordered position-major (every problem's first answer, then every second
+    answer, ...) so a replay advances all problems at once, one array step per position.
+    """
+    problems = data['problem'].cat.codes.to_numpy().astype(np.int32)
+    arrays = {
+        'problems': problems,
+        'duration': data['duration_seconds'].to_numpy(dtype=np.float64),
+        'attempts': data['attempts'].to_numpy(dtype=np.float64),
+        'days': np.nan_to_num(timestamp_days(data['session_timestamp'])),
+        # Compacted summary rows stand for several answers and are folded but not scored
+        'scored': data['merged'].to_numpy() == 1 if 'merged' in data else np.ones(len(data), dtype=bool),
+    }
+
+    counts = np.bincount(problems)
+    group_order = np.argsort(problems, kind='stable')
+    position = np.empty(len(problems), dtype=np.int64)
+    position[group_order] = np.arange(len(problems)) - np.repeat(np.cumsum(counts) - counts, counts)
+    arrays['order'] = np.lexsort((problems, position))
+    arrays['blocks'] = np.cumsum(np.bincount(position))
+
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+
+
+def attach(directory):
+    for name in REPLAY_ARRAYS:
+        shared[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+
+def predictions(arrays, span=EMA_SPAN, weighting='duration_x_attempts', half_life_days=None):
+    """EMA of each row's problem just before the row (NaN for a problem's first answer)."""
+    alpha = 2 / (span + 1)
+    values = WEIGHTINGS[weighting](arrays['duration'], arrays['attempts'])
+    problems = arrays['problems']
+    days = arrays['days']
+    order = arrays['order']
+
+    groups = int(problems.max()) + 1 if len(problems) else 0
+    state = np.zeros(groups)
+    last_days = np.zeros(groups)
+    predicted = np.full(len(problems), np.nan)
+
+    start = 0
+    for position, end in enumerate(arrays['blocks']):
+        rows = order[start:end]
+        start = end
+        group = problems[rows]
+        if position == 0:
+            state[group] = values[rows]
+        else:
+            predicted[rows] = state[group]
+            keep = 1 - alpha
+            if half_life_days is not None:
+                keep = keep * 0.5 ** (np.maximum(days[rows] - last_days[group], 0) / half_life_days)
+            state[group] = keep * state[group] + (1 - keep) * values[rows]
+        last_days[group] = days[rows]
+    return predicted
+
+
+def score(arrays, predicted):
+    """Correlation and mean absolute error of log predicted vs log actual solve time.
+
+    The correlation ignores scale, so weightings that are not in seconds compare fairly;
+    the error is only meaningful for weightings measured in seconds.
+    """
+    mask = np.asarray(arrays['scored']) & np.isfinite(predicted) & (predicted > 0) & (np.asarray(arrays['duration']) > 0)
+    if mask.sum() < 2:
+        return {'scored': int(mask.sum()), 'corr': math.nan, 'mae_log': math.nan}
+
+    predicted_log = np.log(predicted[mask])
+    actual_log = np.log(np.asarray(arrays['duration'])[mask])
+    return {
+        'scored': int(mask.sum()),
+        'corr': float(np.corrcoef(predicted_log, actual_log)[0, 1]),
+        'mae_log': float(np.abs(predicted_log - actual_log).mean()),
+    }
+
+
+def evaluate(config):
+    span, weighting, half_life_days = config
+    result = score(shared, predictions(shared, span, weighting, half_life_days))
+    return {'span': span, 'weighting': weighting, 'half_life_days': half_life_days, **result}
+
+
+def sweep(data_dir, spans, weightings, half_lives, workers=None):
+    """Score every (span, weighting, half-life) combination; results sorted best first."""
+    store = HistoryStore(data_dir)
+    try:
+        store.sync()
+        data = store.read_frame(SUMMARY_COLUMNS)
+    finally:
+        store.close()
+
+    configs = list(itertools.product(spans, weightings, half_lives))
+    with tempfile.TemporaryDirectory() as directory:
+        prepare(data, directory)
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach, initargs=(directory,)) as executor:
+            results = list(executor.map(evaluate, configs))
+
+    return sorted(results, key=lambda result: -result['corr'] if math.isfinite(result['corr']) else math.inf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay history through the adaptive model and sweep its parameters")
+    parser.add_argument('data_dir')
+    parser.add_argument('--spans', type=int, nargs='+', default=[2, 3, 5, 10, 20, 40])
+    parser.add_argument('--weightings', nargs='+', default=list(WEIGHTINGS), choices=list(WEIGHTINGS))
+    parser.add_argument('--half-lives', nargs='+', default=['none', '7', '30'],
+                        help="decay half-lives in days; 'none' for no time decay")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    half_lives = [None if value.lower() == 'none' else float(value) for value in args.half_lives]
+    results = sweep(args.data_dir, args.spans, args.weightings, half_lives, args.workers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'span':>5} {'weighting':<26} {'half-life':>9} {'scored':>9} {'corr':>7} {'mae log':>8}")
+    for result in results:
+        half_life = 'none' if result['half_life_days'] is None else f"{result['half_life_days']:g}"
+        print(f"{result['span']:>5} {result['weighting']:<26} {half_life:>9} {result['scored']:>9}"
+              f" {result['corr']:>7.3f} {result['mae_log']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Progress report over the whole history: solve times, attempts, sessions and slowest problems.
+
+Answers are folded into additive aggregates kept in the history store (solve-time histograms
+per skill cell, attempt counts per operation, sums per session and per problem), so a report
+only reads the answers logged since the previous one and then a few small tables. Compaction
+keeps the aggregates, so they cover answers the store no longer holds one by one.
+
+    python -m src.model.report data/ --sessions 20 --slowest 15
+"""
+import argparse
+import json
+
+import numpy as np
+
+from src.model.problem import OPERATIONS
+from src.model.skills import BUCKET_EDGES, BUCKETS, CELLS, TABLE_SHAPE, problem_cells
+from src.model.store import HistoryStore
+
+# Solve-time histogram bins about 10% wide, from 0.1 s to 1000 s, so percentiles are read
+# off the histogram to within half a bin
+DURATION_EDGES = 0.1 * 1.1 ** np.arange(97)
+DURATION_BINS = len(DURATION_EDGES) + 1
+BIN_VALUES = np.sqrt(np.concatenate([DURATION_EDGES[:1], DURATION_EDGES])
+                     * np.concatenate([DURATION_EDGES, DURATION_EDGES[-1:]]))
+# Answers needing this many attempts or more share the last attempts bucket
+MAX_ATTEMPTS = 5
+PERCENTILES = (50, 90, 99)
+
+
+def aggregate(frame):
+    """Turn a frame of answers into rows for HistoryStore.add_report."""
+    duration = frame['duration_seconds'].to_numpy(dtype=np.float64)
+    attempts = frame['attempts'].to_numpy(dtype=np.int64)
+
+    # Each distinct problem string is parsed once; a missing problem (code -1) gets cell -1
+    problem_codes, texts = frame['problem'].factorize()
+    row_cells = np.append(problem_cells(texts), -1)[problem_codes]
+    ops = np.where(row_cells >= 0, row_cells // (CELLS // len(OPERATIONS)), -1)
+
+    duration_keys = (row_cells + 1) * DURATION_BINS + np.searchsorted(DURATION_EDGES, duration, side='right')
+    keys, counts = np.unique(duration_keys, return_counts=True)
+    cell_ids, bins = np.divmod(keys, DURATION_BINS)
+    duration_rows = list(zip((cell_ids - 1).tolist(), bins.tolist(), counts.tolist()))
+
+    attempt_keys = (ops + 1) * (MAX_ATTEMPTS + 1) + np.clip(attempts, 0, MAX_ATTEMPTS)
+    keys, counts = np.unique(attempt_keys, return_counts=True)
+    op_ids, attempt_counts = np.divmod(keys, MAX_ATTEMPTS + 1)
+    attempt_rows = list(zip((op_ids - 1).tolist(), attempt_counts.tolist(), counts.tolist()))
+
+    # Sessions started in the same second share a timestamp but not a log; answers without
+    # a log (headless, or stored before logs were recorded) are told apart by timestamp
+    session = frame['file_name'].fillna(frame['session_timestamp'].astype(object)).rename('session')
+    sessions = frame.groupby([session, 'session_timestamp'], observed=True).agg(
+        answers=('attempts', 'size'), attempts=('attempts', 'sum'), duration=('duration_seconds', 'sum')
+    )
+    session_rows = list(zip(sessions.index.get_level_values(0).astype(str),
+                            sessions.index.get_level_values(1).astype(str),
+                            sessions['answers'].astype(int).tolist(), sessions['attempts'].astype(int).tolist(),
+                            sessions['duration'].astype(float).tolist()))
+
+    problems = frame.groupby('problem', observed=True).agg(
+        answers=('attempts', 'size'), duration=('duration_seconds', 'sum')
+    )
+    problem_rows = list(zip(problems.index.astype(str), problems['answers'].astype(int).tolist(),
+                            problems['duration'].astype(float).tolist()))
+    return duration_rows, attempt_rows, session_rows, problem_rows
+
+
+def update(store):
+    """Fold answers stored since the last report into the aggregates; returns how many.
+
+    Compacted summary rows (merged > 1) are skipped: compact_history folds the answers they
+    replace before it removes them, so the aggregates keep describing every real answer.
+    """
+    while True:
+        since_id = int(store.get_meta('report_folded_id', 0))
+        frame = store.answers_frame_since(since_id)
+        if len(frame) == 0:
+            return 0
+        answers = frame[frame['merged'] == 1]
+        # Another process may fold the same answers first; then read from its watermark
+        if store.add_report(*aggregate(answers), since_id, int(frame['id'].max())):
+            return len(answers)
+
+
+def percentiles(histogram, percentiles=PERCENTILES):
+    """Solve time at each percentile of histograms over DURATION_EDGES (last axis); NaN if empty."""
+    cumulative = np.cumsum(histogram, axis=-1)
+    total = cumulative[..., -1:]
+    targets = total * (np.asarray(percentiles) / 100)
+    index = (cumulative[..., None, :] >= targets[..., :, None]).argmax(axis=-1)
+    return np.where(total > 0, BIN_VALUES[index], np.nan)
+
+
+def bucket_label(bucket):
+    if bucket == 0:
+        return "0"
+    if bucket == BUCKETS - 1:
+        return f"{BUCKET_EDGES[-1]}+"
+    low, high = BUCKET_EDGES[bucket - 1], BUCKET_EDGES[bucket] - 1
+    return str(low) if low == high else f"{low}-{high}"
+
+
+def summarize(tables, sessions=20, slowest=15, min_answers=3):
+    """Build the report from HistoryStore.read_report tables as plain dicts and lists."""
+    histograms = np.zeros((CELLS + 1, DURATION_BINS))
+    if tables['report_durations']:
+        cell_ids, bins, counts = np.array(tables['report_durations'], dtype=np.int64).T
+        np.add.at(histograms, (cell_ids + 1, bins), counts)
+    # (operation, first bucket, second bucket, bins), carries and borrows merged
+    cell_histograms = histograms[1:].reshape(TABLE_SHAPE + (DURATION_BINS,)).sum(axis=3)
+
+    attempt_counts = np.zeros((len(OPERATIONS) + 1, MAX_ATTEMPTS + 1))
+    if tables['report_attempts']:
+        op_ids, attempts, counts = np.array(tables['report_attempts'], dtype=np.int64).T
+        np.add.at(attempt_counts, (op_ids + 1, attempts), counts)
+
+    operation_histograms = cell_histograms.sum(axis=(1, 2))
+    operation_times = percentiles(operation_histograms)
+    operations = []
+    for code, op in enumerate(OPERATIONS):
+        counts = attempt_counts[code + 1, 1:]
+        if counts.sum() == 0:
+            continue
+        operations.append({
+            'operation': op,
+            'answers': int(operation_histograms[code].sum()),
+            'percentiles': dict(zip(PERCENTILES, operation_times[code].tolist())),
+            'attempts': dict(zip([str(n) for n in range(1, MAX_ATTEMPTS)] + [f"{MAX_ATTEMPTS}+"],
+                                 (counts / counts.sum()).tolist())),
+        })
+
+    # A table is every problem with an operand (as drawn) in that bucket: 7s hold 7 * 3 and 3 * 7
+    buckets = np.arange(BUCKETS)
+    table_histograms = (cell_histograms.sum(axis=2) + cell_histograms.sum(axis=1)
+                        - cell_histograms[:, buckets, buckets])
+    table_answers = table_histograms.sum(axis=-1)
+    table_times = percentiles(table_histograms)
+    tables_report = [
+        {
+            'operation': OPERATIONS[code],
+            'table': bucket_label(bucket),
+            'answers': int(table_answers[code, bucket]),
+            'percentiles': dict(zip(PERCENTILES, table_times[code, bucket].tolist())),
+        }
+        for code, bucket in zip(*np.nonzero(table_answers))
+    ]
+
+    # (session, session_timestamp, answers, attempts, duration), in the order sessions started
+    session_rows = sorted(tables['report_sessions'], key=lambda row: (row[1], row[0]))
+    session_answers = np.array([row[2] for row in session_rows], dtype=np.float64)
+    session_attempts = np.array([row[3] for row in session_rows], dtype=np.float64)
+    recent = slice(max(len(session_rows) - sessions, 0), None)
+    trend = None
+    if len(session_answers[recent]) >= 2:
+        trend = float(np.polyfit(np.arange(len(session_answers[recent])), session_answers[recent], 1)[0])
+
+    problem_names = [row[0] for row in tables['report_problems']]
+    problem_answers = np.array([row[1] for row in tables['report_problems']], dtype=np.float64)
+    problem_durations = np.array([row[2] for row in tables['report_problems']], dtype=np.float64)
+    eligible = np.flatnonzero(problem_answers >= min_answers)
+    means = problem_durations[eligible] / problem_answers[eligible]
+    slowest_order = eligible[np.argsort(-means, kind='stable')[:slowest]]
+
+    return {
+        'overall': {
+            'sessions': len(session_rows),
+            'answers': int(problem_answers.sum()),
+            'accuracy': float(session_answers.sum() / session_attempts.sum()) if session_attempts.sum() else None,
+            'percentiles': dict(zip(PERCENTILES, percentiles(operation_histograms.sum(axis=0)).tolist())),
+        },
+        'operations': operations,
+        'tables': tables_report,
+        'sessions': [
+            {
+                'session': row[1],
+                'score': int(row[2]),
+                'accuracy': row[2] / row[3] if row[3] else None,
+                'mean_seconds': row[4] / row[2] if row[2] else None,
+            }
+            for row in session_rows[recent]
+        ],
+        'score_trend': trend,
+        'slowest': [
+            {
+                'problem': problem_names[i],
+                'answers': int(problem_answers[i]),
+                'mean_seconds': float(problem_durations[i] / problem_answers[i]),
+            }
+            for i in slowest_order.tolist()
+        ],
+    }
+
+
+def build_report(data_dir, sessions=20, slowest=15, min_answers=3):
+    """Sync the store, fold new answers into the aggregates and summarize them."""
+    store = HistoryStore(data_dir)
+    try:
+        store.sync()
+        update(store)
+        tables = store.read_report()
+    finally:
+        store.close()
+    return summarize(tables, sessions, slowest, min_answers)
+
+
+def format_seconds(value):
+    return "-" if value is None or value != value else f"{value:.2f}"
+
+
+def format_report(report):
+    overall = report['overall']
+    accuracy = "-" if overall['accuracy'] is None else f"{overall['accuracy']:.1%}"
+    times = " ".join(f"p{p} {format_seconds(value)}s" for p, value in overall['percentiles'].items())
+    lines = [f"{overall['sessions']} sessions, {overall['answers']} answers, accuracy {accuracy}, {times}", ""]
+
+    header = " ".join(f"{'p' + str(p):>7}" for p in PERCENTILES)
+    attempts_header = " ".join(f"{label:>6}" for label in [str(n) for n in range(1, MAX_ATTEMPTS)] + [f"{MAX_ATTEMPTS}+"])
+    lines.append(f"{'operation':<16} {'answers':>8} {header}   attempts {attempts_header}")
+    for row in report['operations']:
+        values = " ".join(f"{format_seconds(value):>7}" for value in row['percentiles'].values())
+        shares = " ".join(f"{share:>6.1%}" for share in row['attempts'].values())
+        lines.append(f"{row['operation']:<16} {row['answers']:>8} {values}            {shares}")
+
+    lines += ["", f"{'table':<24} {'answers':>8} {header}"]
+    for row in report['tables']:
+        values = " ".join(f"{format_seconds(value):>7}" for value in row['percentiles'].values())
+        lines.append(f"{row['operation'] + ' ' + row['table']:<24} {row['answers']:>8} {values}")
+
+    lines += ["", f"{'session':<20} {'score':>6} {'accuracy':>9} {'mean s':>7}"]
+    for row in report['sessions']:
+        accuracy = "-" if row['accuracy'] is None else f"{row['accuracy']:.1%}"
+        lines.append(f"{row['session']:<20} {row['score']:>6} {accuracy:>9} {format_seconds(row['mean_seconds']):>7}")
+    if report['score_trend'] is not None:
+        lines.append(f"score trend: {report['score_trend']:+.2f} per session over the last {len(report['sessions'])}")
+
+    lines += ["", f"{'slowest problem':<20} {'answers':>8} {'mean s':>7}"]
+    for row in report['slowest']:
+        lines.append(f"{row['problem']:<20} {row['answers']:>8} {format_seconds(row['mean_seconds']):>7}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report solve times, attempts and score trends over the history")
+    parser.add_argument('data_dir')
+    parser.add_argument('--sessions', type=int, default=20, help="recent sessions to list and fit the trend over")
+    parser.add_argument('--slowest', type=int, default=15, help="slowest problems to list")
+    parser.add_argument('--min-answers', type=int, default=3, help="answers a problem needs to count as slow")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.data_dir, args.sessions, args.slowest, args.min_answers)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+
+import numpy as np
+
+
+class AliasTable():
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw.
+
+    Built with array operations rather than Vose's item-by-item loop. Items with less than
+    the mean weight ("light") are laid end to end by their shortfall and items with more
+    ("heavy") by their excess; a light item takes its alias from the heavy item whose excess
+    spans the start of its shortfall. A heavy item whose excess runs out part-way through a
+    light item's shortfall covers the rest of it, and its own bucket is then topped up by
+    the next heavy item, which is what Vose's loop does when a heavy item turns light.
+    """
+
+    def __init__(self, items, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        total = weights.sum()
+        if n == 0 or not total > 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+
+        self.items = items.tolist() if isinstance(items, np.ndarray) else list(items)
+        scaled = weights * (n / total)
+        prob = np.ones(n)
+        alias = np.arange(n)
+
+        heavy_mask = scaled >= 1.0
+        # Rounding can leave equal weights all just under the mean
+        heavy_mask[np.argmax(scaled)] = True
+        light = np.flatnonzero(~heavy_mask)
+        heavy = np.flatnonzero(heavy_mask)
+        if len(light):
+            shortfall = 1.0 - scaled[light]
+            shortfall_end = np.cumsum(shortfall)
+            shortfall_start = shortfall_end - shortfall
+            excess_end = np.cumsum(scaled[heavy] - 1.0)
+
+            donors = np.searchsorted(excess_end, shortfall_start, side='right').clip(max=len(heavy) - 1)
+            prob[light] = scaled[light]
+            alias[light] = heavy[donors]
+
+            # The light item whose shortfall straddles the end of each heavy item's excess;
+            # whatever of it lies past that end is missing from the heavy item's own bucket
+            straddling = np.searchsorted(shortfall_start, excess_end, side='left') - 1
+            overflow = np.where(straddling >= 0, shortfall_end[straddling.clip(min=0)] - excess_end, 0.0)
+            prob[heavy] = 1.0 - overflow.clip(0.0, 1.0)
+            alias[heavy[:-1]] = heavy[1:]
+
+        # Python lists, so a draw indexes them without creating NumPy scalars
+        self.prob = prob.tolist()
+        self.alias = alias.tolist()
+
+    def draw(self, rng=random):
+        i = int(rng.random() * len(self.items))
+        if rng.random() < self.prob[i]:
+            return self.items[i]
+        return self.items[self.alias[i]]
+
+
+class AdaptiveSampler():
+    """Streams problems weighted by a WeightModel, rebuilding its alias table in the background."""
+
+    def __init__(self, weight_model, fallback, operations=None, ranges=None, seed=None, min_interval=0.5):
+        self.weight_model = weight_model
+        self.fallback = fallback
+        self.operations = operations
+        self.ranges = ranges
+        self.rng = random.Random(seed)
+
+        self.table = None
+        # Kept between rebuilds by candidates(): the candidate Problems, each one's index by
+        # problem string, and their weights
+        self.items = None
+        self.positions = None
+        self.weights = None
+        self.lock = threading.Lock()
+        self.building = False
+        self.stale = False
+        self.ready = threading.Event()
+
+        # Rebuilding the table is O(problems), so answers arriving faster than this share one rebuild
+        self.min_interval = min_interval
+        self.last_built = -min_interval
+
+        self.refresh()
+
+    def refresh(self):
+        """Schedule a rebuild from the current weights; repeated calls during a build coalesce."""
+        with self.lock:
+            self.ready.clear()
+            if self.building:
+                self.stale = True
+                return
+            self.building = True
+
+        threading.Thread(target=self.build, daemon=True).start()
+
+    def build(self):
+        while True:
+            delay = self.last_built + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            items, weights = self.candidates()
+            try:
+                table = AliasTable(items, weights)
+            except ValueError:
+                table = None
+
+            with self.lock:
+                self.table = table
+                self.last_built = time.monotonic()
+                if not self.stale:
+                    self.building = False
+                    self.ready.set()
+                    return
+                self.stale = False
+
+    def candidates(self):
+        """Return (items, weights) for the next alias table.
+
+        The first call selects every problem the active settings allow; later calls only
+        select the problems the model has folded since, and replace their weights in place.
+        """
+        changed = self.weight_model.take_changed()
+        if changed is None or self.positions is None:
+            self.items, self.positions, self.weights = [], {}, np.empty(0)
+            entries = self.weight_model.select(self.operations, self.ranges)
+        else:
+            entries = self.weight_model.select(self.operations, self.ranges, changed)
+
+        added = []
+        for text, problem, ema in self.weight_model.problems(entries):
+            position = self.positions.get(text)
+            if position is None:
+                self.positions[text] = len(self.items)
+                self.items.append(problem)
+                added.append(ema)
+            else:
+                self.weights[position] = ema
+        if added:
+            self.weights = np.concatenate([self.weights, added])
+        return self.items, self.weights
+
+    def draw(self, table):
+        return table.draw(self.rng)
+
+    def wait_ready(self, timeout=None):
+        """Block until no rebuild is pending (for tests and benchmarks)."""
+        return self.ready.wait(timeout)
+
+    def problems(self):
+        """Yield adaptive problems forever, using the fallback until a table is ready."""
+        while True:
+            table = self.table
+            if table is None:
+                yield self.fallback()
+            else:
+                yield self.draw(table)
@@ -0,0 +1,200 @@
+import threading
+
+import numpy as np
+
+from src.model.problem import OPERATIONS, Problem, parse_problem
+from src.model.sampler import AdaptiveSampler
+from src.model.store import SUMMARY_COLUMNS, HistoryStore
+from src.model.utils import EMA_SPAN, problem_emas_numpy
+
+# Operand buckets: every value up to 12 is its own bucket (a times-table row), larger
+# values share coarse magnitude buckets (13-19, 20-49, 50-99, 100-199, 200-999, 1000+)
+BUCKET_EDGES = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 20, 50, 100, 200, 1000])
+BUCKETS = len(BUCKET_EDGES) + 1
+# Whether an addition carries or a subtraction borrows in any digit
+FLAGS = 2
+TABLE_SHAPE = (len(OPERATIONS), BUCKETS, BUCKETS, FLAGS)
+CELLS = int(np.prod(TABLE_SHAPE))
+
+# Answers' worth of confidence given to the per-operation average in a cell's estimate
+PRIOR_ANSWERS = 3
+
+
+def buckets(values):
+    return np.searchsorted(BUCKET_EDGES, values, side='right')
+
+
+def regrouping(op_codes, a, b):
+    """Whether each addition carries, or each subtraction borrows, in any digit."""
+    flags = np.zeros(len(op_codes), dtype=bool)
+    carry = np.zeros(len(op_codes), dtype=bool)
+    a, b = a.astype(np.int64), b.astype(np.int64)
+    adding = op_codes == OPERATIONS.index('addition')
+    subtracting = op_codes == OPERATIONS.index('subtraction')
+    while np.any((a > 0) | (b > 0) | carry):
+        digit_a, digit_b = a % 10, b % 10
+        carry = (adding & (digit_a + digit_b + carry >= 10)) | (subtracting & (digit_a - digit_b - carry < 0))
+        flags |= carry
+        a, b = a // 10, b // 10
+    return flags
+
+
+def cells(op_codes, a, b):
+    """Flat skill-table cell of each (operation code, a, b) problem.
+
+    Problems are bucketed by the operands the generator drew (smaller first for subtraction
+    and division, as in drawn_operands) and by whether they carry or borrow.
+    """
+    op_codes = np.asarray(op_codes, dtype=np.int64)
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+
+    quotient = a // np.where(b == 0, 1, b)
+    first = np.select(
+        [op_codes == OPERATIONS.index('subtraction'), op_codes == OPERATIONS.index('division')],
+        [np.minimum(a, b), np.minimum(b, quotient)], a
+    )
+    second = np.select(
+        [op_codes == OPERATIONS.index('subtraction'), op_codes == OPERATIONS.index('division')],
+        [np.maximum(a, b), np.maximum(b, quotient)], b
+    )
+    return np.ravel_multi_index(
+        (op_codes, buckets(first), buckets(second), regrouping(op_codes, a, b).astype(np.int64)),
+        TABLE_SHAPE
+    )
+
+
+def problem_cells(texts):
+    """Flat cell of each problem string, or -1 where it does not parse."""
+    parsed = []
+    for text in texts:
+        try:
+            op, a, b = parse_problem(text)
+            parsed.append((OPERATIONS.index(op), a, b))
+        except (ValueError, KeyError):
+            parsed.append((-1, 0, 0))
+    parsed = np.array(parsed, dtype=np.int64).reshape(-1, 3)
+
+    valid = parsed[:, 0] >= 0
+    text_cells = np.full(len(parsed), -1)
+    text_cells[valid] = cells(parsed[valid, 0], parsed[valid, 1], parsed[valid, 2])
+    return text_cells
+
+
+class SkillModel():
+    """EMA of duration * attempts per skill cell: operation, operand buckets and carry/borrow.
+
+    Unlike WeightModel, which only knows problem strings it has seen, every problem the
+    generator can produce falls in a cell, so costs generalize to problems never asked.
+    """
+
+    def __init__(self, span=EMA_SPAN, prior_answers=PRIOR_ANSWERS):
+        self.alpha = 2 / (span + 1)
+        self.span = span
+        self.prior_answers = prior_answers
+        self.lock = threading.Lock()
+
+        self.ema = np.zeros(CELLS)
+        self.count = np.zeros(CELLS, dtype=np.int64)
+        # {session name: rows of its log included in the fit}
+        self.fitted_rows = {}
+
+    def fit(self, data):
+        """Recompute every cell from a chronological answers frame in a few array passes."""
+        if len(data) == 0:
+            return
+
+        # Each distinct problem string is parsed once
+        problem_codes, texts = data['problem'].factorize()
+        row_cells = problem_cells(texts)[problem_codes]
+
+        keep = (problem_codes >= 0) & (row_cells >= 0)
+        costs = (data['duration_seconds'].astype(np.float64) * data['attempts']).to_numpy()[keep]
+        merged = data['merged'].to_numpy()[keep] if 'merged' in data else np.ones(keep.sum(), dtype=np.int64)
+        row_cells = row_cells[keep]
+        if len(row_cells) == 0:
+            return
+
+        fitted_cells, emas = problem_emas_numpy(row_cells, costs, self.span)
+        with self.lock:
+            self.ema[:] = 0
+            self.ema[fitted_cells.astype(np.int64)] = emas
+            self.count[:] = np.bincount(row_cells, weights=merged, minlength=CELLS).astype(np.int64)
+
+    def fold(self, problem, cost):
+        """Fold one answered Problem into its cell."""
+        cell = int(cells([OPERATIONS.index(problem.op)], [problem.a], [problem.b])[0])
+        with self.lock:
+            if self.count[cell]:
+                self.ema[cell] = (1 - self.alpha) * self.ema[cell] + self.alpha * cost
+            else:
+                self.ema[cell] = cost
+            self.count[cell] += 1
+
+    def update(self, file_path, row, parsed=None, row_number=None):
+        """Fold a freshly logged row; same signature as WeightModel.update."""
+        session_timestamp, problem, duration, attempts = row
+        if parsed is None:
+            try:
+                parsed = Problem.from_text(problem)
+            except (ValueError, KeyError):
+                return
+        self.fold(parsed, duration * attempts)
+
+    def estimates(self):
+        """Cost estimate for every cell, shrunk towards its operation's average.
+
+        Cells without answers take the operation's average, operations without answers the
+        overall average, and with no history at all every cell costs the same.
+        """
+        with self.lock:
+            ema = self.ema.reshape(len(OPERATIONS), -1).copy()
+            count = self.count.reshape(len(OPERATIONS), -1).astype(np.float64)
+
+        total = count.sum()
+        overall = (ema * count).sum() / total if total else 1.0
+        op_totals = count.sum(axis=1)
+        op_means = np.divide((ema * count).sum(axis=1), op_totals,
+                             out=np.full(len(OPERATIONS), overall), where=op_totals > 0)
+
+        prior = op_means[:, None]
+        estimate = (count * ema + self.prior_answers * prior) / (count + self.prior_answers)
+        return estimate.ravel()
+
+
+class SkillSampler(AdaptiveSampler):
+    """Generates problems in weak skill cells, including problems never asked before.
+
+    A cell is drawn with probability proportional to its estimated cost times its share of
+    random generation, so with no history this matches get_random_problem, then a problem
+    is drawn uniformly within the cell; both steps are O(1).
+    """
+
+    def __init__(self, skill_model, space, fallback, seed=None, min_interval=0.5):
+        self.space = space
+        super().__init__(skill_model, fallback, seed=seed, min_interval=min_interval)
+
+    def candidates(self):
+        cells = self.space.cells
+        return cells, self.weight_model.estimates()[cells] * self.space.shares[cells]
+
+    def draw(self, table):
+        return self.space.problem(table.draw(self.rng), self.rng)
+
+
+def load_skill_model(data_dir, span=EMA_SPAN):
+    """Fit a SkillModel on the whole synced history."""
+    store = HistoryStore(data_dir)
+    try:
+        store.sync()
+        # The manifest is read with the answers, so it counts exactly the rows fitted
+        with store.snapshot():
+            data = store.read_frame(SUMMARY_COLUMNS)
+            manifest = store.read_manifest()
+    finally:
+        store.close()
+
+    skill_model = SkillModel(span)
+    skill_model.fit(data)
+    skill_model.fitted_rows = {session: rows for session, (size, rows) in manifest.items()}
+    return skill_model
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.model.generator import from_draws
+from src.model.problem import DEFAULT_RANGES, OPERATIONS, Problem, operand_ranges, parse_problem
+from src.model.skills import BUCKET_EDGES, CELLS, cells
+
+# Bump when the table layout or the feature cells change, so cached tables are rebuilt
+SPACE_VERSION = 1
+ARRAYS = ('op_codes', 'operands', 'entry_cells', 'entry_shares', 'keys')
+
+
+def settings_key(operations, ranges):
+    """Hash of everything that decides a problem space, used to name its cache file."""
+    enabled = [op for op in OPERATIONS if operations.get(op)]
+    bounds = {op: operand_ranges(op, ranges) or operand_ranges(op, DEFAULT_RANGES) for op in enabled}
+    description = json.dumps({
+        'version': SPACE_VERSION,
+        'buckets': BUCKET_EDGES.tolist(),
+        'bounds': {op: [list(bound) for bound in bounds[op]] for op in enabled},
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()[:16]
+
+
+class ProblemSpace():
+    """Every problem the generator can draw under some settings, as NumPy arrays.
+
+    One entry per operand draw: op_codes, operands (a, b, answer), entry_cells (skill-table
+    cell) and entry_shares (its probability under get_random_problem), plus the sorted
+    (op, a, b) keys of the distinct problems for coverage lookups. Entries are sorted
+    by cell, so cell c holds entries starts[c]:starts[c] + sizes[c] and a uniform problem
+    within a cell takes O(1). Sampling and coverage queries are array operations.
+    """
+
+    def __init__(self, operations, ranges, arrays=None):
+        if arrays is None:
+            arrays = build_arrays(operations, ranges)
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+        self.sizes = np.bincount(self.entry_cells, minlength=CELLS)
+        self.starts = np.cumsum(self.sizes) - self.sizes
+        # Probability of each cell under uniform random generation
+        self.shares = np.bincount(self.entry_cells, weights=self.entry_shares, minlength=CELLS)
+        self.cells = np.flatnonzero(self.sizes)
+        self.radix = key_radix(self.operands)
+
+    @classmethod
+    def load(cls, operations, ranges, cache_dir=None):
+        """Return the space for these settings, reading or writing cache_dir/space_<hash>.npz."""
+        if cache_dir is None:
+            return cls(operations, ranges)
+
+        cache_path = os.path.join(cache_dir, f"space_{settings_key(operations, ranges)}.npz")
+        try:
+            with np.load(cache_path) as cached:
+                return cls(operations, ranges, {name: cached[name] for name in ARRAYS})
+        except (OSError, KeyError, ValueError):
+            pass
+
+        space = cls(operations, ranges)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Written under a temporary name and renamed, so a reader never sees half a file
+        temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            np.savez(file, **{name: getattr(space, name) for name in ARRAYS})
+        os.replace(temporary_path, cache_path)
+        return space
+
+    def __len__(self):
+        return len(self.op_codes)
+
+    def problem_at(self, i):
+        a, b, answer = self.operands[i].tolist()
+        return Problem(OPERATIONS[self.op_codes[i]], a, b, answer)
+
+    def problem(self, cell, rng):
+        """A uniformly random problem from one cell."""
+        return self.problem_at(self.starts[cell] + int(rng.random() * self.sizes[cell]))
+
+    def sample(self, size, rng, cell_weights=None):
+        """Indices of size entries drawn like get_random_problem, or reweighted per skill cell.
+
+        rng is a numpy Generator; cell_weights, if given, multiplies each cell's share.
+        """
+        probabilities = self.entry_shares
+        if cell_weights is not None:
+            probabilities = probabilities * np.asarray(cell_weights)[self.entry_cells]
+        return rng.choice(len(self), size=size, p=probabilities / probabilities.sum())
+
+    def problems(self, indices):
+        return [self.problem_at(i) for i in np.asarray(indices).tolist()]
+
+    def encode(self, op_codes, a, b):
+        return encode(op_codes, a, b, self.radix)
+
+    def problem_keys(self, problems):
+        """(op, a, b) keys of problem strings, and a mask of which ones this space can produce."""
+        parsed = []
+        for text in problems:
+            try:
+                op, a, b = parse_problem(text)
+                parsed.append((OPERATIONS.index(op), a, b))
+            except (ValueError, KeyError):
+                parsed.append((0, -1, -1))
+        op_codes, a, b = np.array(parsed, dtype=np.int64).reshape(-1, 3).T
+
+        keys = self.encode(op_codes, a, b)
+        found = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        inside = (a >= 0) & (a < self.radix) & (b >= 0) & (b < self.radix)
+        return keys, inside & (self.keys[found] == keys)
+
+    def key_cells(self, keys):
+        op_codes, rest = np.divmod(keys, self.radix * self.radix)
+        return cells(op_codes, *np.divmod(rest, self.radix))
+
+    def coverage(self, problems):
+        """Share of this space's distinct problems found among problems, overall and per cell.
+
+        Returns (covered fraction, {cell: (distinct problems seen, distinct problems in the cell)}).
+        """
+        keys, inside = self.problem_keys(set(map(str, problems)))
+        seen = keys[inside]
+
+        totals = np.bincount(self.key_cells(self.keys), minlength=CELLS)
+        covered = np.bincount(self.key_cells(seen), minlength=CELLS)
+        per_cell = {int(cell): (int(covered[cell]), int(totals[cell])) for cell in np.flatnonzero(totals)}
+        return len(seen) / max(len(self.keys), 1), per_cell
+
+
+def key_radix(operands):
+    return int(operands[:, :2].max()) + 1 if len(operands) else 1
+
+
+def encode(op_codes, a, b, radix):
+    return (np.asarray(op_codes, dtype=np.int64) * radix + a) * radix + b
+
+
+def build_arrays(operations, ranges):
+    op_codes, operands, entry_cells, entry_shares = [], [], [], []
+    enabled = [op for op in OPERATIONS if operations.get(op)]
+    if not enabled:
+        raise ValueError("at least one operation must be enabled")
+
+    for op in enabled:
+        (lo1, hi1), (lo2, hi2) = operand_ranges(op, ranges) or operand_ranges(op, DEFAULT_RANGES)
+        num1, num2 = np.meshgrid(np.arange(lo1, hi1 + 1), np.arange(lo2, hi2 + 1), indexing='ij')
+        num1, num2 = num1.ravel(), num2.ravel()
+        a, b, answer = from_draws(op, num1, num2)
+
+        code = OPERATIONS.index(op)
+        op_codes.append(np.full(len(num1), code, dtype=np.int8))
+        operands.append(np.stack([a, b, answer], axis=1).astype(np.int64))
+        entry_cells.append(cells(np.full(len(num1), code), a, b))
+        # The generator picks an operation uniformly, then its operands uniformly
+        entry_shares.append(np.full(len(num1), 1 / (len(enabled) * len(num1))))
+
+    entry_cells = np.concatenate(entry_cells)
+    order = np.argsort(entry_cells, kind='stable')
+    op_codes = np.concatenate(op_codes)[order]
+    operands = np.concatenate(operands)[order]
+    return {
+        'op_codes': op_codes,
+        'operands': operands,
+        'entry_cells': entry_cells[order],
+        'entry_shares': np.concatenate(entry_shares)[order],
+        'keys': np.unique(encode(op_codes, operands[:, 0], operands[:, 1], key_radix(operands))),
+    }
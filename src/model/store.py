@@ -0,0 +1,541 @@
+import csv
+import io
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from src.model import records
+
+# 2: parsed operand columns on weights (derived, so it is dropped and rebuilt from answers)
+# 3: manifest keyed by session name, so a session's .csv and .rec share one entry
+# 4: answers.merged (answers a compacted summary row stands for) and weights.last_seen;
+#    a summary always stands for several answers, so merged > 1 marks exactly the summaries
+# 5: answers.file_name and file_row (the session log and row an answer was logged to), unique
+#    together, so an answer recorded live and read from its log again is stored once
+# 6: report_sessions keyed by session name, as sessions started in the same second share a timestamp
+SCHEMA_VERSION = 6
+
+FRAME_COLUMNS = ('session_timestamp', 'problem', 'duration_seconds', 'attempts')
+SUMMARY_COLUMNS = FRAME_COLUMNS + ('merged',)
+CATEGORICAL_COLUMNS = ('session_timestamp', 'problem')
+COMPACT_DTYPES = {
+    'session_timestamp': 'category',
+    'problem': 'category',
+    'duration_seconds': np.float32,
+    'attempts': np.uint16,
+    'merged': np.uint32,
+}
+CHUNK_ROWS = 100_000
+# Seconds a connection waits for another process's write lock before giving up
+BUSY_TIMEOUT = 30
+SYNC_WORKERS = min(8, os.cpu_count() or 1)
+# Header-only logs younger than this may belong to a running session
+EMPTY_LOG_MIN_AGE = 3600
+
+
+TABLES = """
+    CREATE TABLE IF NOT EXISTS answers (
+        id INTEGER PRIMARY KEY,
+        session_timestamp TEXT,
+        problem TEXT,
+        duration_seconds REAL,
+        attempts INTEGER,
+        merged INTEGER NOT NULL DEFAULT 1,
+        file_name TEXT,  -- session name, NULL for headless answers, summaries and rows stored before v5
+        file_row INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS answers_problem ON answers (problem);
+    CREATE INDEX IF NOT EXISTS answers_time ON answers (session_timestamp);
+    CREATE TABLE IF NOT EXISTS manifest (
+        file_name TEXT PRIMARY KEY,  -- session name, without .csv/.rec
+        size INTEGER,
+        rows INTEGER  -- rows of the log read into answers
+    );
+    CREATE TABLE IF NOT EXISTS weights (
+        problem TEXT PRIMARY KEY,
+        op TEXT,
+        a INTEGER,
+        b INTEGER,
+        ema REAL,
+        count INTEGER,
+        last_seen TEXT
+    );
+    CREATE INDEX IF NOT EXISTS weights_op ON weights (op, a, b);
+    CREATE TABLE IF NOT EXISTS report_durations (
+        cell INTEGER,  -- skill-table cell, -1 for problems that do not parse
+        bin INTEGER,   -- solve-time histogram bin
+        count INTEGER,
+        PRIMARY KEY (cell, bin)
+    );
+    CREATE TABLE IF NOT EXISTS report_attempts (
+        op INTEGER,
+        attempts INTEGER,
+        count INTEGER,
+        PRIMARY KEY (op, attempts)
+    );
+    CREATE TABLE IF NOT EXISTS report_sessions (
+        session TEXT PRIMARY KEY,  -- session name, or the timestamp for answers without one
+        session_timestamp TEXT,
+        answers INTEGER,
+        attempts INTEGER,
+        duration REAL
+    );
+    CREATE TABLE IF NOT EXISTS report_problems (
+        problem TEXT PRIMARY KEY,
+        answers INTEGER,
+        duration REAL
+    )
+"""
+REPORT_TABLES = ('report_durations', 'report_attempts', 'report_sessions', 'report_problems')
+
+
+class HistoryStore():
+    """SQLite copy of every logged answer, with a manifest of ingested session logs.
+
+    Several sessions or processes may share a store: every read-modify-write runs in a
+    transaction() holding SQLite's write lock, and WAL lets readers carry on meanwhile.
+    """
+
+    def __init__(self, data_dir, db_name="history.db"):
+        self.data_dir = data_dir
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+
+        self.db_path = os.path.join(data_dir, db_name)
+        self.load_stats = None
+        # Stores are opened on a worker thread and then handed to the UI thread
+        self.conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+
+        # Answers are committed one at a time from the UI thread; with WAL and NORMAL sync
+        # a commit appends to the log without an fsync
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block under SQLite's write lock, committing it on success.
+
+        BEGIN IMMEDIATE takes the lock up front, so two processes cannot both read the
+        same state and then write conflicting updates; the other one waits its turn.
+        """
+        self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    @contextmanager
+    def snapshot(self):
+        """Run several reads against one consistent state, while other processes keep writing."""
+        self.conn.commit()
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.conn.commit()
+
+    def create_tables(self):
+        """Create the answer table, its problem index, the manifest, the weight model and report aggregates."""
+        # Under the write lock, so processes opening an old store migrate it exactly once
+        with self.transaction():
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            version = int(self.get_meta('schema_version', 1))
+            if version < 4:
+                self.conn.execute("DROP TABLE IF EXISTS weights")
+                self.conn.execute("DELETE FROM meta WHERE key = 'weights_folded_id'")
+
+            report_columns = [row[1] for row in self.conn.execute("PRAGMA table_info(report_sessions)")]
+            rekey_sessions = version < 6 and report_columns and 'session' not in report_columns
+            if rekey_sessions:
+                self.conn.execute("ALTER TABLE report_sessions RENAME TO report_sessions_v5")
+
+            for statement in TABLES.split(';'):
+                self.conn.execute(statement)
+
+            if version < 3:
+                self.conn.execute("""
+                    UPDATE manifest SET file_name = substr(file_name, 1, length(file_name) - 4)
+                    WHERE file_name LIKE '%.csv'
+                """)
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(answers)")]
+            if version < 4 and 'merged' not in columns:
+                self.conn.execute("ALTER TABLE answers ADD COLUMN merged INTEGER NOT NULL DEFAULT 1")
+            if version < 5 and 'file_name' not in columns:
+                self.conn.execute("ALTER TABLE answers ADD COLUMN file_name TEXT")
+                self.conn.execute("ALTER TABLE answers ADD COLUMN file_row INTEGER")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS answers_file_row ON answers (file_name, file_row)")
+            if rekey_sessions:
+                # Sessions folded so far can only be told apart by timestamp
+                self.conn.execute("""
+                    INSERT INTO report_sessions (session, session_timestamp, answers, attempts, duration)
+                    SELECT session_timestamp, session_timestamp, answers, attempts, duration FROM report_sessions_v5
+                """)
+                self.conn.execute("DROP TABLE report_sessions_v5")
+            self.set_meta('schema_version', SCHEMA_VERSION)
+
+    def session_files(self):
+        """Map each session name to its log file, preferring .rec over .csv."""
+        # A converted session may have both a .csv and a .rec; they hold the same rows,
+        # so each session is read from one file, preferring the compact .rec
+        sessions = {}
+        for file_name in os.listdir(self.data_dir):
+            session, extension = os.path.splitext(file_name)
+            if not session.startswith('math_practice_') or extension not in ('.csv', records.EXTENSION):
+                continue
+            if extension == records.EXTENSION or session not in sessions:
+                sessions[session] = file_name
+        return sessions
+
+    def read_rows(self, file_path):
+        """Read a session log's rows as (session_timestamp, problem, duration_seconds, attempts).
+
+        A CSV row that does not parse is None; see read_csv_rows.
+        """
+        if file_path.endswith(records.EXTENSION):
+            return records.read_rows(file_path)
+        return self.read_csv_rows(file_path)
+
+    def read_log(self, file_path):
+        """read_rows(), or None, reported on stderr, for a log that cannot be read at all."""
+        try:
+            return self.read_rows(file_path)
+        except (OSError, ValueError) as e:
+            print(f"Skipped session log {file_path}: {e}", file=sys.stderr)
+            return None
+
+    def sync(self, workers=SYNC_WORKERS):
+        """Fold session logs (CSV or .rec) that are new or have grown since the last sync into the store.
+
+        Changed logs are read on a pool of `workers` threads without holding the write lock;
+        rows are then inserted in session order under it. Nothing is deleted here, header-only
+        logs included: syncs run in the background and such a file may belong to a session
+        that has just started. See remove_empty_logs() for cleaning them up.
+
+        Rows that do not parse are skipped and reported on stderr, as are logs that cannot be
+        read at all, so one damaged file never stops the rest of the history from loading.
+        """
+        manifest = self.read_manifest()
+
+        # Session files are named by timestamp, so sorting keeps ingestion chronological
+        pending = []
+        for session, file_name in sorted(self.session_files().items()):
+            file_path = os.path.join(self.data_dir, file_name)
+            size = os.path.getsize(file_path)
+            known_size, known_rows = manifest.get(session, (None, 0))
+            if size != known_size:
+                pending.append((session, file_path, size))
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            contents = list(executor.map(self.read_log, [file_path for _, file_path, _ in pending]))
+
+        with self.transaction():
+            # Another process may have synced since the manifest was read; logs are append-only,
+            # so re-checking the counts under the lock is enough
+            manifest = self.read_manifest()
+            for (session, file_path, size), rows in zip(pending, contents):
+                known_size, known_rows = manifest.get(session, (None, 0))
+                if rows is not None and size != known_size:
+                    self.insert_rows(session, size, known_rows, rows)
+                    # Line numbers in the file, after its header
+                    skipped = [line for line, row in enumerate(rows[known_rows:], start=known_rows + 2) if row is None]
+                    if skipped:
+                        print(f"Skipped malformed rows in {file_path}, lines {', '.join(map(str, skipped))}",
+                              file=sys.stderr)
+
+    def read_manifest(self):
+        return {
+            file_name: (size, rows)
+            for file_name, size, rows in self.conn.execute("SELECT file_name, size, rows FROM manifest")
+        }
+
+    def insert_rows(self, session, size, known_rows, rows):
+        """Store the rows of one session log not yet ingested and update its manifest entry."""
+        # Session logs are append-only, so only rows past the last sync are new; rows that a
+        # running session has already recorded are keyed by the same (file, row) and ignored
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO answers (session_timestamp, problem, duration_seconds, attempts, file_name, file_row) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(*row, session, file_row) for file_row, row in enumerate(rows[known_rows:], start=known_rows)
+             if row is not None]
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO manifest (file_name, size, rows) VALUES (?, ?, ?)",
+            (session, size, max(len(rows), known_rows))
+        )
+
+    def remove_empty_logs(self, min_age=EMPTY_LOG_MIN_AGE):
+        """Delete header-only session logs last written more than min_age seconds ago.
+
+        This is an explicit maintenance step, never part of loading history; the age check
+        leaves alone the log of a session that is still running. Returns the removed paths.
+        """
+        removed = []
+        now = time.time()
+        for file_name in sorted(os.listdir(self.data_dir)):
+            session, extension = os.path.splitext(file_name)
+            if not session.startswith('math_practice_') or extension not in ('.csv', records.EXTENSION):
+                continue
+            file_path = os.path.join(self.data_dir, file_name)
+            # A log that cannot be read is left for someone to look at
+            if now - os.path.getmtime(file_path) < min_age or self.read_log(file_path) != []:
+                continue
+
+            os.remove(file_path)
+            removed.append(file_path)
+
+        # Forget sessions with no log left; one that still has a .csv or .rec keeps its entry
+        remaining = self.session_files()
+        with self.transaction():
+            for file_path in removed:
+                session = os.path.splitext(os.path.basename(file_path))[0]
+                if session not in remaining:
+                    self.conn.execute("DELETE FROM manifest WHERE file_name = ? AND rows = 0", (session,))
+        return removed
+
+    def read_csv_rows(self, file_path):
+        """Read the data rows of a session CSV as typed tuples.
+
+        A row that does not parse is None, so the rows after it keep their row numbers. A last
+        line without its newline is left out: it is still being written, or was cut short.
+        """
+        with open(file_path, newline='', encoding='utf-8') as file:
+            text = file.read()
+        reader = csv.reader(io.StringIO(text[:text.rfind('\n') + 1]))
+        next(reader, None)  # Skip header
+
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            try:
+                session_timestamp, problem, duration, attempts = row
+                rows.append((session_timestamp, problem, float(duration), int(attempts)))
+            except ValueError:
+                rows.append(None)
+        return rows
+
+    def iter_frames(self, columns=FRAME_COLUMNS, chunk_rows=CHUNK_ROWS):
+        """Yield stored answers in chronological order as compact frames of at most chunk_rows rows."""
+        query = f"SELECT {', '.join(columns)} FROM answers ORDER BY session_timestamp, id"
+        for chunk in pd.read_sql_query(query, self.conn, chunksize=chunk_rows):
+            yield chunk.astype({column: dtype for column, dtype in COMPACT_DTYPES.items() if column in chunk})
+
+    def read_frame(self, columns=FRAME_COLUMNS, chunk_rows=CHUNK_ROWS, memory_limit=None):
+        """Return stored answers in chronological order as one compact DataFrame.
+
+        Rows are streamed from SQLite chunk_rows at a time. String columns are kept as integer
+        codes into one shared category list and numbers are downcast, so only one raw chunk
+        is ever held alongside the compact result. Raises MemoryError once the result would
+        exceed memory_limit bytes. Row count, chunk count and the peak bytes held are left
+        in self.load_stats.
+        """
+        query = f"SELECT {', '.join(columns)} FROM answers ORDER BY session_timestamp, id"
+        categories = {column: {} for column in columns if column in CATEGORICAL_COLUMNS}
+        parts = {column: [] for column in columns}
+        held = 0
+        peak = 0
+        chunks = 0
+
+        for chunk in pd.read_sql_query(query, self.conn, chunksize=chunk_rows):
+            chunks += 1
+            raw_bytes = int(chunk.memory_usage(deep=True).sum())
+
+            for column in columns:
+                if column in categories:
+                    # Map this chunk's distinct strings onto codes shared by every chunk
+                    codes, uniques = pd.factorize(chunk[column])
+                    lookup = categories[column]
+                    shared = np.array([lookup.setdefault(value, len(lookup)) for value in uniques], dtype=np.int32)
+                    part = shared[codes]
+                else:
+                    part = chunk[column].to_numpy().astype(COMPACT_DTYPES[column])
+                parts[column].append(part)
+                held += part.nbytes
+
+            peak = max(peak, held + raw_bytes)
+            if memory_limit is not None and held > memory_limit:
+                raise MemoryError(
+                    f"history needs more than {memory_limit} bytes in memory; stream it with iter_frames()"
+                )
+
+        data = {}
+        for column in columns:
+            if column in categories:
+                codes = np.concatenate(parts[column]) if parts[column] else np.empty(0, np.int32)
+                data[column] = pd.Categorical.from_codes(codes, categories=list(categories[column]))
+            else:
+                data[column] = np.concatenate(parts[column]) if parts[column] else np.empty(0, COMPACT_DTYPES[column])
+        frame = pd.DataFrame(data, columns=list(columns))
+
+        self.load_stats = {
+            'rows': len(frame),
+            'chunks': chunks,
+            'peak_bytes': max(peak, int(frame.memory_usage(deep=True).sum())),
+        }
+        return frame
+
+    def record_answer(self, file_path, row, row_number=None):
+        """Store a row as it is logged, before the session's log file necessarily holds it.
+
+        row_number is the row's index in the log at file_path. The next sync that reads the
+        row from the file finds it stored under the same (file, row) key and skips it, so
+        the answer is stored once whichever gets there first.
+        """
+        # Headless sessions log no file; their answers have no key
+        file_name = os.path.splitext(os.path.basename(file_path))[0] if file_path is not None else None
+        with self.transaction():
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO answers (session_timestamp, problem, duration_seconds, attempts, file_name, file_row) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*row, file_name, row_number if file_name is not None else None)
+            )
+        return cursor.lastrowid
+
+    def answers_since(self, answer_id):
+        """Return (id, session_timestamp, problem, duration_seconds, attempts, merged) for rows stored after answer_id."""
+        return self.conn.execute(
+            "SELECT id, session_timestamp, problem, duration_seconds, attempts, merged FROM answers "
+            "WHERE id > ? ORDER BY id",
+            (answer_id,)
+        ).fetchall()
+
+    def last_answer_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM answers").fetchone()[0]
+
+    def load_weights(self):
+        """Return (problem, op, a, b, ema, count, last_seen) rows of the persisted weight model."""
+        return self.conn.execute("SELECT problem, op, a, b, ema, count, last_seen FROM weights").fetchall()
+
+    def save_weights(self, rows, folded_id, generation):
+        """Persist (problem, op, a, b, ema, count, last_seen) rows and the last answer id they include.
+
+        Another process sharing the store may have saved weights that include later answers;
+        then nothing is written and False is returned, so the caller can fold those answers
+        (answers_since) and save again rather than overwrite newer rows with older ones.
+        Weights loaded under an older weights_generation() are refused too: the table has
+        been cleared since, and rows from before would be mixed with a rebuild.
+        """
+        with self.transaction():
+            if self.weights_generation() != generation or int(self.get_meta('weights_folded_id', 0)) > folded_id:
+                return False
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO weights (problem, op, a, b, ema, count, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.set_meta('weights_folded_id', folded_id)
+        return True
+
+    def weights_generation(self):
+        """Counts the times the weight model was cleared; see save_weights."""
+        return int(self.get_meta('weights_generation', 0))
+
+    def delete_weights(self):
+        """Clear the weight model and start a new generation of it. Call within a transaction()."""
+        self.conn.execute("DELETE FROM weights")
+        self.conn.execute("DELETE FROM meta WHERE key = 'weights_folded_id'")
+        self.set_meta('weights_generation', self.weights_generation() + 1)
+
+    def answers_frame_since(self, answer_id):
+        """Answers stored after answer_id, with their merged counts and session names, as a frame."""
+        return pd.read_sql_query(
+            f"SELECT id, file_name, {', '.join(SUMMARY_COLUMNS)} FROM answers WHERE id > ?",
+            self.conn, params=(answer_id,)
+        )
+
+    def add_report(self, duration_rows, attempt_rows, session_rows, problem_rows, since_id, folded_id):
+        """Add answers since_id < id <= folded_id to the report aggregates.
+
+        duration_rows are (cell, bin, count), attempt_rows (op, attempts, count), session_rows
+        (session, session_timestamp, answers, attempts, duration) and problem_rows (problem,
+        answers, duration). The aggregates are sums, so they are only added if nobody else has folded
+        answers since since_id; otherwise False is returned and the caller reads again.
+        """
+        with self.transaction():
+            if int(self.get_meta('report_folded_id', 0)) != since_id:
+                return False
+            self.conn.executemany("""
+                INSERT INTO report_durations (cell, bin, count) VALUES (?, ?, ?)
+                ON CONFLICT (cell, bin) DO UPDATE SET count = count + excluded.count
+            """, duration_rows)
+            self.conn.executemany("""
+                INSERT INTO report_attempts (op, attempts, count) VALUES (?, ?, ?)
+                ON CONFLICT (op, attempts) DO UPDATE SET count = count + excluded.count
+            """, attempt_rows)
+            self.conn.executemany("""
+                INSERT INTO report_sessions (session, session_timestamp, answers, attempts, duration)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (session) DO UPDATE SET answers = answers + excluded.answers,
+                    attempts = attempts + excluded.attempts, duration = duration + excluded.duration
+            """, session_rows)
+            self.conn.executemany("""
+                INSERT INTO report_problems (problem, answers, duration) VALUES (?, ?, ?)
+                ON CONFLICT (problem) DO UPDATE SET answers = answers + excluded.answers,
+                    duration = duration + excluded.duration
+            """, problem_rows)
+            self.set_meta('report_folded_id', folded_id)
+        return True
+
+    def read_report(self):
+        """Return the report aggregate tables as {table name: list of rows}."""
+        with self.snapshot():
+            return {table: self.conn.execute(f"SELECT * FROM {table}").fetchall() for table in REPORT_TABLES}
+
+    def session_cutoff(self, keep_sessions):
+        """Timestamp of the oldest of the keep_sessions most recent sessions, or None."""
+        row = self.conn.execute(
+            "SELECT DISTINCT session_timestamp FROM answers ORDER BY session_timestamp DESC LIMIT 1 OFFSET ?",
+            (keep_sessions - 1,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def read_before(self, cutoff):
+        """Answers from sessions before cutoff, chronologically, with their merged counts."""
+        return pd.read_sql_query(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM answers WHERE session_timestamp < ? "
+            "ORDER BY session_timestamp, id",
+            self.conn, params=(cutoff,)
+        )
+
+    def replace_before(self, cutoff, summary_rows):
+        """Swap the answers to each summarized problem from sessions before cutoff for its summary row.
+
+        summary_rows are (session_timestamp, problem, duration_seconds, attempts, merged), one
+        per problem, with merged > 1; answers to other problems are left as they are.
+        The weight model is cleared, since its folded-answer watermark no longer applies; the
+        new generation stops models loaded before from saving into the rebuilt table. The
+        report aggregates are kept: compact_history folds old answers into them first, and
+        summary rows are never folded.
+        """
+        with self.transaction():
+            self.conn.executemany(
+                "DELETE FROM answers WHERE session_timestamp < ? AND problem = ?",
+                [(cutoff, problem) for session_timestamp, problem, *rest in summary_rows]
+            )
+            self.conn.executemany(
+                "INSERT INTO answers (session_timestamp, problem, duration_seconds, attempts, merged) "
+                "VALUES (?, ?, ?, ?, ?)",
+                summary_rows
+            )
+            self.delete_weights()
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def close(self):
+        self.conn.close()
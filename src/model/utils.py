@@ -1,41 +1,444 @@
+import math
 import numpy as np
 import pandas as pd
-import os
+import threading
+from datetime import datetime, timedelta
 
-def parse_historical_data(data_dir):
-    all_data = []
+from src.model.generator import ProblemGenerator
+from src.model.problem import (DEFAULT_RANGES, OPERATIONS, REVERSED, Problem, drawn_operands, in_ranges,
+                               operand_ranges, parse_problem)
+from src.model.store import FRAME_COLUMNS, SUMMARY_COLUMNS, HistoryStore
 
-    for file_name in os.listdir(data_dir):
-        if file_name.endswith('.csv'):
-            file_path = os.path.join(data_dir, file_name)
-            data = pd.read_csv(file_path)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-            if len(data) == 0:
-                os.remove(file_path)
-                continue
-
-            all_data.append(data)
-    combined_data = pd.concat(all_data, ignore_index=True)
+def parse_historical_data(data_dir, columns=FRAME_COLUMNS, memory_limit=None):
+    # Only session logs added since the last run are parsed; the rest comes from the store.
+    # The frame is compact (categorical strings, downcast numbers); its load statistics,
+    # including peak bytes held while loading, are in combined_data.attrs['load_stats']
+    store = HistoryStore(data_dir)
+    try:
+        store.sync()
+        combined_data = store.read_frame(columns, memory_limit=memory_limit)
+        combined_data.attrs['load_stats'] = store.load_stats
+    finally:
+        store.close()
 
     return combined_data
 
-def model(data):
-    ema_prob = {}
+EMA_SPAN = 10
+
+def problem_emas(data, span=EMA_SPAN):
+    # Last EMA of duration * attempts for every problem, in a single grouped pass
+    cost = data['duration_seconds'].astype(np.float64) * data['attempts']
+    ema = cost.groupby(data['problem'], sort=False).ewm(span=span, adjust=False).mean()
+    last_ema = ema.groupby(level=0, sort=False).last()
+
+    return last_ema.index.to_numpy(), last_ema.to_numpy()
+
+def problem_emas_numpy(problems, costs, span=EMA_SPAN, days=None, half_life_days=None):
+    # Closed form of the adjust=False EMA: the i-th value from the end of a group weighs
+    # alpha * (1 - alpha) ** i, except the first value of the group, which weighs (1 - alpha) ** i
+    alpha = 2 / (span + 1)
+
+    unique_problems, first_index, codes = np.unique(problems, return_index=True, return_inverse=True)
+    counts = np.bincount(codes)
+
+    order = np.argsort(codes, kind='stable')
+    group_starts = np.cumsum(counts) - counts
+    position = np.empty(len(codes), dtype=np.int64)
+    position[order] = np.arange(len(codes)) - np.repeat(group_starts, counts)
+
+    if half_life_days is None:
+        from_end = counts[codes] - 1 - position
+        weights = np.where(position == 0, 1.0, alpha) * (1 - alpha) ** from_end
+    else:
+        weights = decayed_weights(codes, order, position, group_starts + counts - 1, alpha, days, half_life_days)
+    emas = np.bincount(codes, weights=weights * costs, minlength=len(unique_problems))
+
+    # Report problems in order of first appearance, like the pandas engine
+    appearance = np.argsort(first_index)
+    return unique_problems[appearance], emas[appearance]
+
+def decayed_weights(codes, order, position, group_ends, alpha, days, half_life_days):
+    # Each step keeps r = (1 - alpha) * 0.5 ** (gap_days / half_life_days) of the previous EMA,
+    # so a long break between attempts counts the older attempts for less. A value's weight is
+    # (1 - r) at its own step times the product of r over the later steps of its group, which
+    # is a difference of prefix sums of log r taken in group order
+    sorted_days = np.asarray(days, dtype=np.float64)[order]
+    gaps = np.nan_to_num(np.diff(sorted_days, prepend=sorted_days[:1]), nan=0.0).clip(min=0)
+    log_keep = math.log(1 - alpha) - math.log(2) * gaps / half_life_days
+    log_keep[position[order] == 0] = 0.0
+
+    cumulative = np.cumsum(log_keep)
+    sorted_codes = codes[order]
+    later = np.exp(cumulative[group_ends[sorted_codes]] - cumulative)
+    own = np.where(position[order] == 0, 1.0, -np.expm1(log_keep))
+
+    weights = np.empty(len(codes))
+    weights[order] = own * later
+    return weights
+
+def timestamp_days(timestamps):
+    """Days since the epoch for session timestamps; NaN where a timestamp does not parse."""
+    series = pd.Series(timestamps)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Each session's timestamp is parsed once
+        days = timestamp_days(series.cat.categories.astype(str))
+        return days[series.cat.codes.to_numpy()]
+    times = pd.to_datetime(series.astype(str), format=TIMESTAMP_FORMAT, errors='coerce')
+    return (times - pd.Timestamp(0)).dt.total_seconds().to_numpy() / 86400
+
+def session_ranks(timestamps):
+    """Integer keys that sort a session_timestamp column chronologically.
+
+    Timestamps are fixed-width strings, so their lexical order is chronological; a categorical
+    column is ranked through its categories rather than its string values.
+    """
+    series = pd.Series(timestamps)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories.to_numpy(dtype=str)
+        ranks = np.empty(len(categories), dtype=np.int64)
+        ranks[np.argsort(categories, kind='stable')] = np.arange(len(categories))
+        return ranks[series.cat.codes.to_numpy()], np.sort(categories)
+    values = series.to_numpy(dtype=str)
+    sessions, ranks = np.unique(values, return_inverse=True)
+    return ranks, sessions
 
-    for problem in data['problem'].unique():
-        problem_data = data[data['problem'] == problem]
+def model(data, engine='pandas', span=EMA_SPAN, half_life_days=None):
+    # Rows are folded in session order (ties keep their logged order); half_life_days decays
+    # older attempts by elapsed time, which needs the numpy engine. compact_history bounds
+    # how much history there is to fold
+    if 'session_timestamp' in data:
+        ranks, sessions = session_ranks(data['session_timestamp'])
+        data = data.iloc[np.argsort(ranks, kind='stable')]
 
-        ema_prob[problem] = (problem_data['duration_seconds'] * problem_data['attempts']).ewm(span=10, adjust=False).mean().iloc[-1]
+    costs = (data['duration_seconds'].astype(np.float64) * data['attempts']).to_numpy()
+    if half_life_days is not None:
+        days = timestamp_days(data['session_timestamp'])
+        problems, emas = problem_emas_numpy(data['problem'].to_numpy(dtype=object), costs, span,
+                                            days, half_life_days)
+    elif engine == 'numpy':
+        problems, emas = problem_emas_numpy(data['problem'].to_numpy(dtype=object), costs, span)
+    else:
+        problems, emas = problem_emas(data, span)
 
-    problem_weights = {problem: ema / sum(ema_prob.values()) for problem, ema in ema_prob.items()}
+    problem_weights = dict(zip(problems, emas / emas.sum()))
 
     return problem_weights
 
-def sample_problems(data_dir, sample_size):
-    data = parse_historical_data(data_dir)
-    problem_weights = model(data)
+class WeightModel():
+    """Per-problem EMA of duration * attempts, persisted in the history store and updated online.
+
+    With half_life_days set, the EMA also decays with the time between a problem's attempts,
+    matching model(..., half_life_days=...).
+    """
+
+    def __init__(self, store, span=EMA_SPAN, half_life_days=None):
+        self.store = store
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.half_life_days = half_life_days
+        self.lock = threading.Lock()
+
+        # Set by load(); False once another session keeps the shared weights under another half-life
+        self.persisted = True
+        self.load()
+
+    def load(self, claim=True):
+        """Read the persisted weights, then fold any answers stored after them.
+
+        Weights persisted under another half-life are cleared and recomputed rather than mixed,
+        unless claim is False: then the table is left to the session that cleared it, and this
+        model keeps its own entries and stops saving them.
+        """
+        with self.store.transaction():
+            half_life = str(self.half_life_days or '')
+            if self.store.get_meta('weights_half_life', '') != half_life:
+                if not claim:
+                    self.persisted = False
+                    return
+                self.store.delete_weights()
+                self.store.set_meta('weights_half_life', half_life)
+
+            # Weights, watermark and generation are read together, as other sessions may be saving
+            rows = self.store.load_weights()
+            self.folded_id = int(self.store.get_meta('weights_folded_id', 0))
+            self.generation = self.store.weights_generation()
+
+        with self.lock:
+            # entries: {problem: (ema, count)}; operands: {problem: (op, a, b)}
+            # index: {op: {first drawn operand: set of problems}} for settings lookups
+            # last_seen: {problem: session_timestamp of its latest attempt}
+            # changed: problems folded since take_changed(), None when every entry is new
+            self.entries = {}
+            self.operands = {}
+            self.index = {}
+            self.last_seen = {}
+            self.changed = None
+            for problem, op, a, b, ema, count, last_seen in rows:
+                self.entries[problem] = (ema, count)
+                self.last_seen[problem] = last_seen
+                self.add_to_index(problem, (op, a, b))
+        self.catch_up()
+
+    def add_to_index(self, problem, operands):
+        op, a, b = operands
+        self.operands[problem] = operands
+        if op is None:
+            return
+        first, second = drawn_operands(op, a, b)
+        self.index.setdefault(op, {}).setdefault(first, set()).add(problem)
+
+    def index_problem(self, problem):
+        """Parse a problem string once and add it to the operation/operand index."""
+        if problem in self.operands:
+            return self.operands[problem]
+        try:
+            operands = parse_problem(problem)
+        except (ValueError, KeyError):
+            operands = (None, None, None)
+        self.add_to_index(problem, operands)
+        return operands
+
+    def row(self, problem):
+        return (problem, *self.operands[problem], *self.entries[problem], self.last_seen.get(problem))
+
+    def catch_up(self):
+        """Fold answers stored after folded_id, in id order, and persist the changed entries.
+
+        These are this session's new answers, answers that reached the store without going
+        through update(), and answers logged meanwhile by other sessions sharing the store,
+        so every session's model follows the same sequence of answers. Compacted summary
+        rows stand for answers already folded and are skipped.
+        """
+        if not self.entries:
+            self.rebuild()
+            return
+
+        changed = set()
+        while True:
+            rows = self.store.answers_since(self.folded_id)
+            for answer_id, session_timestamp, problem, duration, attempts, merged in rows:
+                if merged == 1:
+                    self.fold(problem, duration * attempts, session_timestamp)
+                    changed.add(problem)
+            if rows:
+                self.folded_id = rows[-1][0]
+
+            if not changed or not self.persisted or self.save(changed):
+                return
+            # Compaction or another half-life has cleared the table: start over from what it holds
+            if self.store.weights_generation() != self.generation:
+                self.load(claim=False)
+                return
+
+    def save(self, problems):
+        """Persist the entries of problems; False if the store refuses them (see save_weights)."""
+        return self.store.save_weights([self.row(problem) for problem in problems], self.folded_id, self.generation)
+
+    def rebuild(self):
+        """Recompute every entry from the full history with the grouped EMA engine."""
+        with self.store.snapshot():
+            folded_id = self.store.last_answer_id()
+            data = self.store.read_frame(SUMMARY_COLUMNS)
+        if len(data) == 0:
+            return
+
+        if self.half_life_days is None:
+            problems, emas = problem_emas(data, self.span)
+        else:
+            costs = (data['duration_seconds'].astype(np.float64) * data['attempts']).to_numpy()
+            problems, emas = problem_emas_numpy(data['problem'].to_numpy(dtype=object), costs, self.span,
+                                                timestamp_days(data['session_timestamp']), self.half_life_days)
+        # A compacted summary row stands for `merged` answers
+        grouped = data.groupby('problem', observed=True, sort=False)
+        counts = grouped['merged'].sum()
+        last_seen = grouped['session_timestamp'].last()
+        with self.lock:
+            for problem, ema in zip(problems, emas):
+                self.entries[problem] = (float(ema), int(counts[problem]))
+                self.last_seen[problem] = str(last_seen[problem])
+                self.index_problem(problem)
+            self.changed = None
+        self.folded_id = folded_id
+        if self.persisted and not self.save(self.entries):
+            self.catch_up()
+
+    def fold(self, problem, cost, session_timestamp=None):
+        with self.lock:
+            if problem in self.entries:
+                ema, count = self.entries[problem]
+                keep = (1 - self.alpha) * self.decay(self.last_seen.get(problem), session_timestamp)
+                self.entries[problem] = (keep * ema + (1 - keep) * cost, count + 1)
+            else:
+                self.entries[problem] = (cost, 1)
+                self.index_problem(problem)
+            if session_timestamp is not None:
+                self.last_seen[problem] = session_timestamp
+            if self.changed is not None:
+                self.changed.add(problem)
+
+    def decay(self, previous, current):
+        """Time decay between two attempts' session timestamps; 1 without a half-life."""
+        if self.half_life_days is None or previous is None or current is None:
+            return 1.0
+        try:
+            gap = datetime.strptime(current, TIMESTAMP_FORMAT) - datetime.strptime(previous, TIMESTAMP_FORMAT)
+        except ValueError:
+            return 1.0
+        return 0.5 ** (max(gap.total_seconds(), 0) / 86400 / self.half_life_days)
+
+    def update(self, file_path, row, parsed=None, row_number=None):
+        """Record a freshly logged CSV row and fold it into the model.
+
+        The row is folded by catch_up() together with any answers other sessions logged
+        since the last update, which costs O(1) per answer. parsed is the Problem the row
+        was logged for, which saves re-parsing its text; row_number is its row in the log.
+        """
+        session_timestamp, problem, duration, attempts = row
+        self.store.record_answer(file_path, row, row_number)
+        if parsed is not None and problem not in self.operands:
+            with self.lock:
+                self.add_to_index(problem, (parsed.op, parsed.a, parsed.b))
+        self.catch_up()
+
+    def select(self, operations=None, ranges=None, problems=None):
+        """Return {problem: (ema, count)} for problems the given settings could produce.
+
+        Candidates come from the operation/operand index, so the cost depends on the size
+        of the selected ranges rather than on the number of problems ever logged. With
+        problems given, only those problem strings are considered.
+        """
+        with self.lock:
+            if problems is not None:
+                return {
+                    problem: self.entries[problem] for problem in problems
+                    if problem in self.entries and self.allows(problem, operations, ranges)
+                }
+            if operations is None:
+                return dict(self.entries)
+
+            selected = {}
+            for op in OPERATIONS:
+                if not operations.get(op) or op not in self.index:
+                    continue
+
+                by_first = self.index[op]
+                bounds = operand_ranges(op, ranges or {})
+                if bounds is None:
+                    firsts = list(by_first.keys())
+                else:
+                    (lo1, hi1), (lo2, hi2) = bounds
+                    firsts = set(range(lo1, hi1 + 1))
+                    if op in REVERSED:
+                        firsts.update(range(lo2, hi2 + 1))
+
+                for first in firsts:
+                    for problem in by_first.get(first, ()):
+                        if bounds is None or in_ranges(*self.operands[problem], ranges):
+                            selected[problem] = self.entries[problem]
+            return selected
+
+    def allows(self, problem, operations, ranges):
+        """Whether select(operations, ranges) would return a problem string."""
+        if operations is None:
+            return True
+        op, a, b = self.operands[problem]
+        return op is not None and bool(operations.get(op)) and in_ranges(op, a, b, ranges or {})
+
+    def take_changed(self):
+        """Problems folded since the last call, or None if every entry may be new (after a load).
+
+        For the one sampler drawing from this model, so it can update its candidates in place.
+        """
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def problems(self, selected):
+        """Return (problem string, Problem, ema) for selected entries, skipping unparseable strings."""
+        triples = []
+        for problem, (ema, count) in selected.items():
+            op, a, b = self.operands[problem]
+            if op is not None:
+                triples.append((problem, Problem.from_operands(op, a, b), ema))
+        return triples
+
+    def weights(self, operations=None, ranges=None):
+        """Return normalized {problem: weight}, matching model() over the same history."""
+        entries = self.select(operations, ranges)
+        problems = list(entries.keys())
+        emas = np.array([ema for ema, count in entries.values()])
+        return dict(zip(problems, emas / emas.sum()))
+
+def load_weight_model(data_dir, half_life_days=None):
+    store = HistoryStore(data_dir)
+    store.sync()
+    return WeightModel(store, half_life_days=half_life_days)
+
+def compact_history(data_dir, keep_sessions=None, keep_days=None, span=EMA_SPAN, half_life_days=None, now=None):
+    """Fold answers older than the kept window into one summary row per problem.
+
+    A summary row carries the problem's EMA as its cost (attempts 1), the number of answers it
+    replaces in `merged`, and the timestamp of the last of them. A problem with only one old
+    row keeps it as it is, so merged > 1 tells summaries apart from real answers. Because an
+    adjust=False EMA continues from its last value alone, the model over the compacted store
+    matches the model over the full history (up to float32 storage of the cost), while its
+    size stays bounded. The report aggregates take in the old answers before they go.
+    Returns the number of answer rows removed.
+    """
+    # Imported here: the report builds on the skill cells, which build on this module
+    from src.model import report
+
+    store = HistoryStore(data_dir)
+    try:
+        store.sync()
+        cutoffs = []
+        if keep_sessions is not None:
+            cutoffs.append(store.session_cutoff(keep_sessions))
+        if keep_days is not None:
+            cutoffs.append(((now or datetime.now()) - timedelta(days=keep_days)).strftime(TIMESTAMP_FORMAT))
+        cutoffs = [cutoff for cutoff in cutoffs if cutoff is not None]
+        if not cutoffs:
+            return 0
+
+        # The more generous of the two windows wins
+        cutoff = min(cutoffs)
+        report.update(store)
+        old = store.read_before(cutoff)
+        if len(old) == 0:
+            return 0
+
+        costs = (old['duration_seconds'] * old['attempts']).to_numpy(dtype=np.float64)
+        problems = old['problem'].to_numpy(dtype=object)
+        days = timestamp_days(old['session_timestamp']) if half_life_days is not None else None
+        summary_problems, emas = problem_emas_numpy(problems, costs, span, days, half_life_days)
+
+        grouped = old.groupby('problem', sort=False)
+        rows = grouped.size()
+        counts = grouped['merged'].sum()
+        last_seen = grouped['session_timestamp'].last()
+        summary_rows = [
+            (last_seen[problem], problem, float(ema), 1, int(counts[problem]))
+            for problem, ema in zip(summary_problems, emas) if rows[problem] > 1
+        ]
+        store.replace_before(cutoff, summary_rows)
+        return sum(int(rows[row[1]]) for row in summary_rows) - len(summary_rows)
+    finally:
+        store.close()
+
+def sample_problems(data_dir, sample_size, weight_model=None):
+    if weight_model is None:
+        weight_model = load_weight_model(data_dir)
+
+    problem_weights = weight_model.weights()
+    if not problem_weights:
+        # No history yet: fall back to uniformly random problems over the default settings
+        generator = ProblemGenerator(dict.fromkeys(OPERATIONS, True), DEFAULT_RANGES)
+        return np.array([str(generator.next_problem()) for _ in range(sample_size)], dtype=object)
+
     problems = list(problem_weights.keys())
     probabilities = list(problem_weights.values())
 
     sampled_problems = np.random.choice(problems, size=sample_size, p=probabilities)
-    return sampled_problems
\ No newline at end of file
+    return sampled_problems
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_history, write_history
+from src.model.problem import in_ranges
+from src.model.store import SUMMARY_COLUMNS, HistoryStore
+from src.model.utils import (WeightModel, compact_history, model, parse_historical_data, problem_emas,
+                             problem_emas_numpy, timestamp_days)
+
+TIMESTAMP = '2030-01-01 00:00:00'
+
+
+@pytest.fixture
+def history():
+    return synthetic_history(3000, seed=2)
+
+
+def test_numpy_engine_matches_pandas(history):
+    problems, emas = problem_emas(history)
+    numpy_problems, numpy_emas = problem_emas_numpy(
+        history['problem'].to_numpy(dtype=object),
+        (history['duration_seconds'] * history['attempts']).to_numpy(dtype=np.float64),
+    )
+    assert list(numpy_problems) == list(problems)
+    np.testing.assert_allclose(numpy_emas, emas, rtol=1e-12)
+
+
+def test_decayed_closed_form_matches_online_fold(tmp_path, history):
+    costs = (history['duration_seconds'] * history['attempts']).to_numpy(dtype=np.float64)
+    problems, emas = problem_emas_numpy(history['problem'].to_numpy(dtype=object), costs,
+                                        days=timestamp_days(history['session_timestamp']), half_life_days=3)
+
+    store = HistoryStore(str(tmp_path))
+    weight_model = WeightModel(store, half_life_days=3)
+    for problem, cost, session_timestamp in zip(history['problem'], costs, history['session_timestamp']):
+        weight_model.fold(problem, cost, session_timestamp)
+    store.close()
+
+    np.testing.assert_allclose([weight_model.entries[problem][0] for problem in problems], emas, rtol=1e-9)
+
+
+def test_compacted_history_keeps_the_model(tmp_path):
+    write_history(str(tmp_path), 3000, seed=3)
+    before = model(parse_historical_data(str(tmp_path)))
+    compact_history(str(tmp_path), keep_sessions=10)
+    after = model(parse_historical_data(str(tmp_path)))
+
+    assert after.keys() == before.keys()
+    for problem, weight in before.items():
+        assert after[problem] == pytest.approx(weight, rel=1e-5)
+
+    store = HistoryStore(str(tmp_path))
+    data = store.read_frame(SUMMARY_COLUMNS)
+    store.close()
+    assert data['merged'].sum() == 3000
+    # Only summaries stand for several answers, and every summary does
+    old = data[data['session_timestamp'].astype(str) < sorted(data['session_timestamp'].astype(str).unique())[-10]]
+    assert (old.groupby('problem', observed=True).size() == 1).all()
+
+
+def assert_same_entries(entries, expected):
+    assert entries.keys() == expected.keys()
+    for problem, (ema, count) in expected.items():
+        assert entries[problem][0] == pytest.approx(ema, rel=1e-5)
+        assert entries[problem][1] == count
+
+
+def test_compaction_during_a_session_keeps_the_saved_weights(tmp_path):
+    write_history(str(tmp_path), 3000, seed=4)
+    store = HistoryStore(str(tmp_path))
+    store.sync()
+    weight_model = WeightModel(store)
+    compact_history(str(tmp_path), keep_sessions=10)
+    weight_model.update(None, (TIMESTAMP, '3 + 4', 2.0, 1))
+    assert sum(count for ema, count in weight_model.entries.values()) == 3001
+
+    fresh = HistoryStore(str(tmp_path))
+    loaded = WeightModel(fresh).entries
+    with fresh.transaction():
+        fresh.delete_weights()
+    rebuilt = WeightModel(fresh).entries
+    assert_same_entries(loaded, rebuilt)
+    assert_same_entries(weight_model.entries, rebuilt)
+    for store in (store, fresh):
+        store.close()
+
+
+def test_a_session_under_another_half_life_stops_saving(tmp_path):
+    write_history(str(tmp_path), 500, seed=8)
+    stores = [HistoryStore(str(tmp_path)) for _ in range(3)]
+    stores[0].sync()
+    undecayed = WeightModel(stores[0])
+    decayed = WeightModel(stores[1], half_life_days=3)
+
+    undecayed.update(None, (TIMESTAMP, '3 + 4', 255.0, 3))
+    decayed.catch_up()
+    assert not undecayed.persisted
+    assert undecayed.entries['3 + 4'][1] == decayed.entries['3 + 4'][1]
+    assert_same_entries(WeightModel(stores[2], half_life_days=3).entries, decayed.entries)
+    for store in stores:
+        store.close()
+
+
+def test_select_keeps_only_problems_the_settings_allow(tmp_path):
+    write_history(str(tmp_path), 2000, seed=11)
+    store = HistoryStore(str(tmp_path))
+    store.sync()
+    weight_model = WeightModel(store)
+    store.close()
+
+    operations = {'addition': True, 'division': True}
+    ranges = {'addition': {'operand1': (2, 20), 'operand2': (2, 20)},
+              'multiplication': {'operand1': (2, 5), 'operand2': (2, 12)}}
+    selected = weight_model.select(operations, ranges)
+    expected = {
+        problem: entry for problem, entry in weight_model.entries.items()
+        if operations.get(weight_model.operands[problem][0])
+        and in_ranges(*weight_model.operands[problem], ranges)
+    }
+    assert selected == expected
+    assert selected and len(selected) < len(weight_model.entries)
+    # Subtraction and division draw from the source ranges in either order
+    assert all(max(a, b) <= 20 for op, a, b in map(weight_model.operands.get, selected) if op == 'addition')
+    assert all(min(b, a // b) <= 5 for op, a, b in map(weight_model.operands.get, selected) if op == 'division')
+    assert weight_model.select(operations, ranges, problems=list(weight_model.entries)) == expected
+    assert weight_model.select() == weight_model.entries
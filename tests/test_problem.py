@@ -0,0 +1,62 @@
+import pytest
+
+from src.model.generator import ProblemGenerator
+from src.model.problem import Problem, parse_problem
+
+
+@pytest.mark.parametrize('text, answer', [('7 + 8', 15), ('30 - 12', 18), ('12 * 9', 108), ('650 / 10', 65)])
+def test_problem_carries_an_integer_answer(text, answer):
+    problem = Problem.from_text(text)
+    assert problem.answer == answer
+    assert isinstance(problem.answer, int)
+    assert str(problem) == text
+    assert Problem.from_operands(*parse_problem(text)) == problem
+
+
+@pytest.mark.parametrize('text', ['7 +', '7 % 8', 'seven + 8'])
+def test_unparseable_problems_raise(text):
+    with pytest.raises((ValueError, KeyError)):
+        Problem.from_text(text)
+
+
+def test_check_answer_compares_integers():
+    from src.base.math_loop import QuestionBase
+
+    question_base = QuestionBase({'operations': {'division': True}, 'ranges': {}}, seed=1)
+    problem = question_base.get_problem()
+    assert question_base.check_answer(problem, problem.answer)
+    assert not question_base.check_answer(problem, problem.answer + 1)
+
+
+ALL_OPERATIONS = {'addition': True, 'subtraction': True, 'multiplication': True, 'division': True}
+RANGES = {'addition': {'operand1': (2, 30), 'operand2': (5, 9)},
+          'multiplication': {'operand1': (2, 6), 'operand2': (3, 40)}}
+
+
+def draw(generator, n):
+    return [generator.next_problem() for _ in range(n)]
+
+
+def test_seeded_generators_repeat_across_blocks():
+    first = draw(ProblemGenerator(ALL_OPERATIONS, RANGES, block_size=64, seed=5), 500)
+    assert first == draw(ProblemGenerator(ALL_OPERATIONS, RANGES, block_size=64, seed=5), 500)
+    assert first != draw(ProblemGenerator(ALL_OPERATIONS, RANGES, block_size=64, seed=6), 500)
+
+
+def test_generated_problems_follow_the_settings():
+    problems = draw(ProblemGenerator({'subtraction': True, 'division': True}, RANGES, block_size=256, seed=2), 4000)
+    assert {problem.op for problem in problems} == {'subtraction', 'division'}
+    for problem in problems:
+        assert problem == Problem.from_operands(problem.op, problem.a, problem.b)
+        if problem.op == 'subtraction':
+            # Non-negative, from the addition ranges
+            assert problem.a >= problem.b and {problem.a, problem.b} <= set(range(2, 31))
+        else:
+            # Whole-number quotients, from the multiplication ranges
+            assert problem.a % problem.b == 0
+            assert 2 <= problem.b <= 6 and problem.b <= problem.answer <= 40
+
+
+def test_generator_needs_an_operation():
+    with pytest.raises(ValueError):
+        ProblemGenerator({'addition': False}, RANGES)
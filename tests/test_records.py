@@ -0,0 +1,70 @@
+import csv
+import os
+import struct
+from datetime import datetime
+
+import pytest
+
+from src.base.logger import RecordLogger
+from src.model import records
+from src.model.problem import Problem
+from src.model.store import HistoryStore
+
+TIMESTAMP = '2030-01-01 00:00:00'
+ROWS = [(TIMESTAMP, '7 * 8', 2.5, 1), (TIMESTAMP, '650 / 10', 4.125, 3), (TIMESTAMP, '12 - 30', 1.75, 300)]
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['session_timestamp', 'problem', 'duration_seconds', 'attempts'])
+        writer.writerows(rows)
+
+
+def test_logged_records_read_back(tmp_path):
+    logger = RecordLogger(str(tmp_path), datetime(2030, 1, 1))
+    for session_timestamp, text, duration, attempts in ROWS:
+        logger.log(Problem.from_text(text), duration, attempts)
+    logger.close()
+
+    assert os.path.getsize(logger.filename) == records.HEADER_SIZE + len(ROWS) * records.RECORD.size
+    assert records.read_rows(logger.filename) == ROWS
+    assert records.read_rows(logger.filename, start=2) == ROWS[2:]
+
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'math_practice_20300101_000000.rec')
+    with open(path, 'wb') as file:
+        file.write(records.header(TIMESTAMP))
+        file.write(records.pack(Problem.from_text('7 * 8'), 2.5, 1))
+        file.write(records.pack(Problem.from_text('3 + 4'), 1.5, 1)[:6])
+    assert records.read_rows(path) == ROWS[:1]
+
+
+def test_one_byte_attempts_records_are_still_read(tmp_path):
+    path = str(tmp_path / 'math_practice_20300101_000000.rec')
+    with open(path, 'wb') as file:
+        file.write(b'ZMREC001' + TIMESTAMP.encode('ascii').ljust(records.HEADER_SIZE - 8, b'\0'))
+        file.write(struct.pack('<BBiif', records.OP_CODES['multiplication'], 2, 7, 8, 2.5))
+    assert records.read_rows(path) == [(TIMESTAMP, '7 * 8', 2.5, 2)]
+
+
+def test_convert_csv_keeps_every_row(tmp_path):
+    csv_path = str(tmp_path / 'math_practice_20300101_000000.csv')
+    write_csv(csv_path, ROWS)
+    record_path = records.convert_csv(csv_path, remove=True)
+
+    assert not os.path.exists(csv_path)
+    assert records.read_rows(record_path) == ROWS
+    store = HistoryStore(str(tmp_path))
+    store.sync()
+    assert store.read_manifest() == {'math_practice_20300101_000000': (os.path.getsize(record_path), len(ROWS))}
+    store.close()
+
+
+def test_convert_csv_refuses_rows_a_record_cannot_hold(tmp_path):
+    csv_path = str(tmp_path / 'math_practice_20300101_000000.csv')
+    write_csv(csv_path, ROWS + [(TIMESTAMP, '2 + 2', 1.0, 70000)])
+    with pytest.raises(ValueError, match='row 5'):
+        records.convert_csv(csv_path)
+    assert os.listdir(tmp_path) == ['math_practice_20300101_000000.csv']
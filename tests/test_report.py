@@ -0,0 +1,67 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_history
+from src.model import report
+from src.model.store import HistoryStore
+from src.model.utils import compact_history, parse_historical_data
+
+LATER_ROWS = [('2030-01-01 00:00:00', f"{i} * 7", 1.0 + i / 10, 1 + i % 3) for i in range(30)]
+
+
+def write_later_session(data_dir):
+    with open(os.path.join(data_dir, 'math_practice_20300101_000000.csv'), 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['session_timestamp', 'problem', 'duration_seconds', 'attempts'])
+        writer.writerows(LATER_ROWS)
+
+
+def test_incremental_report_matches_one_pass(tmp_path):
+    incremental, one_pass = str(tmp_path / 'incremental'), str(tmp_path / 'one_pass')
+    for data_dir in (incremental, one_pass):
+        write_history(data_dir, 2000, seed=5)
+
+    report.build_report(incremental)
+    write_later_session(incremental)
+    write_later_session(one_pass)
+    assert report.build_report(incremental) == report.build_report(one_pass)
+
+
+def test_compaction_keeps_the_report(tmp_path):
+    write_history(str(tmp_path), 3000, seed=6)
+    before = report.build_report(str(tmp_path), sessions=100)
+    compact_history(str(tmp_path), keep_sessions=10)
+    write_later_session(str(tmp_path))
+    after = report.build_report(str(tmp_path), sessions=100)
+
+    assert after['overall']['answers'] == before['overall']['answers'] + len(LATER_ROWS)
+    assert after['sessions'][:-1] == before['sessions']
+    assert report.build_report(str(tmp_path), sessions=100) == after
+
+    store = HistoryStore(str(tmp_path))
+    assert int(store.get_meta('report_folded_id')) == store.last_answer_id()
+    store.close()
+
+
+def test_percentiles_are_within_a_bin(tmp_path):
+    write_history(str(tmp_path), 3000, seed=7)
+    exact = np.percentile(parse_historical_data(str(tmp_path))['duration_seconds'], report.PERCENTILES)
+    estimated = list(report.build_report(str(tmp_path))['overall']['percentiles'].values())
+    assert estimated == pytest.approx(exact, rel=0.1)
+
+
+def test_sessions_started_in_the_same_second_are_reported_apart(tmp_path):
+    write_history(str(tmp_path), 200, seed=10)
+    write_later_session(str(tmp_path))
+    with open(tmp_path / 'math_practice_20300101_000000_2.csv', 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['session_timestamp', 'problem', 'duration_seconds', 'attempts'])
+        writer.writerows(LATER_ROWS[:5])
+
+    sessions = report.build_report(str(tmp_path))['sessions']
+    assert [(row['session'], row['score']) for row in sessions[-2:]] == [
+        ('2030-01-01 00:00:00', len(LATER_ROWS)), ('2030-01-01 00:00:00', 5)
+    ]
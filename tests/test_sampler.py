@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_history
+from src.model.sampler import AdaptiveSampler, AliasTable
+from src.model.store import HistoryStore
+from src.model.utils import WeightModel
+
+TIMESTAMP = '2030-01-01 00:00:00'
+
+
+@pytest.mark.parametrize('weights', [
+    [1.0, 2.0, 3.0, 4.0],
+    [0.0, 5.0, 0.0, 1.0, 0.25],
+    [1 / 3] * 7,
+    [1.0] + [1e-6] * 50,
+])
+def test_alias_table_draws_each_item_by_its_weight(weights):
+    table = AliasTable(list(range(len(weights))), weights)
+    # Each bucket keeps its own item with prob and passes the rest to its alias
+    shares = np.array(table.prob)
+    np.add.at(shares, table.alias, 1 - np.array(table.prob))
+    np.testing.assert_allclose(shares / len(weights), np.array(weights) / sum(weights), atol=1e-12)
+
+    rng = random.Random(3)
+    draws = np.bincount([table.draw(rng) for _ in range(200_000)], minlength=len(weights))
+    np.testing.assert_allclose(draws / draws.sum(), np.array(weights) / sum(weights), atol=0.005)
+
+
+def test_alias_table_needs_a_positive_weight():
+    with pytest.raises(ValueError):
+        AliasTable(['a', 'b'], [0.0, 0.0])
+
+
+def test_candidates_are_updated_in_place(tmp_path):
+    write_history(str(tmp_path), 2000, seed=9)
+    store = HistoryStore(str(tmp_path))
+    store.sync()
+    weight_model = WeightModel(store)
+    operations = {'addition': True, 'multiplication': True}
+    ranges = {'multiplication': {'operand1': (2, 12), 'operand2': (2, 12)}}
+    sampler = AdaptiveSampler(weight_model, fallback=lambda: None, operations=operations, ranges=ranges,
+                              min_interval=0)
+    sampler.wait_ready()
+
+    # A new problem, an existing one and one the settings exclude
+    for text in ('11 * 12', '3 * 4', '7 - 2', '3 * 4'):
+        weight_model.update(None, (TIMESTAMP, text, 4.0, 2))
+    items, weights = sampler.candidates()
+    full = AdaptiveSampler(weight_model, fallback=lambda: None, operations=operations, ranges=ranges)
+    full.wait_ready()
+
+    assert dict(zip(map(str, items), weights)) == dict(zip(map(str, full.items), full.weights))
+    assert '7 - 2' not in map(str, items)
+    store.close()
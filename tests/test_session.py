@@ -0,0 +1,89 @@
+import csv
+import math
+from datetime import datetime
+
+from src.base.logger import SessionLogger
+from src.base.math_loop import QuestionBase
+from src.base.session import Session, SimulatedClock, SimulatedSolver, run_headless
+
+SETTINGS = {'operations': {'addition': True, 'multiplication': True}, 'ranges': {}}
+
+
+def headless_session(seed=1, logger=None, duration=120):
+    return Session(QuestionBase(SETTINGS, seed=seed), logger, duration=duration, clock=SimulatedClock())
+
+
+def test_headless_sessions_are_reproducible():
+    sessions = [headless_session() for _ in range(2)]
+    scores = [run_headless(session, SimulatedSolver(seed=4)) for session in sessions]
+
+    assert scores[0] == scores[1] > 0
+    assert sessions[0].total_attempts == sessions[1].total_attempts >= scores[0]
+    assert sessions[0].clock.now() == sessions[0].deadline
+    assert sessions[0].is_over() and not sessions[0].submit(0)
+
+
+def test_headless_session_logs_every_answer(tmp_path):
+    logger = SessionLogger(str(tmp_path), datetime(2030, 1, 1))
+    session = headless_session(logger=logger)
+    score = run_headless(session, SimulatedSolver(seed=4))
+
+    with open(logger.filename, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))[1:]
+    assert len(rows) == score
+    assert sum(int(row[3]) for row in rows) == session.total_attempts
+    assert all(float(row[2]) > 0 for row in rows)
+    assert sum(float(row[2]) for row in rows) <= 120
+
+
+def test_prefetched_problems_are_served_in_order():
+    session = headless_session()
+    session.next_problem()
+    session.prefetch()
+    upcoming = list(session.upcoming)
+    assert len(upcoming) == session.prefetch_size
+    assert all(text == str(problem) and answer == str(problem.answer) for problem, text, answer in upcoming)
+
+    for problem, text, answer in upcoming:
+        session.submit(session.current_problem.answer)
+        assert (session.current_problem, session.problem_text, session.answer_text) == (problem, text, answer)
+    assert not session.upcoming
+
+
+def test_typed_answers_are_accepted_only_when_exact():
+    session = headless_session()
+    session.next_problem()
+    answer = str(session.current_problem.answer)
+    assert session.accepts(answer)
+    assert not session.accepts(answer + '0') and not session.accepts(' ' + answer)
+    assert session.total_attempts == 0
+
+
+def test_session_ends_at_its_deadline_however_late_the_ticks():
+    session = headless_session(duration=10)
+    start = session.clock.now()
+    session.next_problem()
+
+    # Ticks arriving 0.3 s late every second would add up to 3 s over ten ticks
+    when = start
+    while not session.tick():
+        assert session.time_remaining == math.ceil(session.deadline - when)
+        when += 1.3
+        session.clock.advance_to(when)
+    assert session.deadline == start + 10
+    assert when - start < 10 + 1.3
+    assert session.time_remaining == 0 and session.seconds_left() == 0
+
+
+def test_answers_are_timed_on_the_session_clock(tmp_path):
+    logger = SessionLogger(str(tmp_path), datetime(2030, 1, 1))
+    session = headless_session(logger=logger)
+    session.next_problem()
+    session.clock.advance_to(2.5)
+    session.submit(session.current_problem.answer + 1)
+    session.clock.advance_to(4.0)
+    assert session.submit(session.current_problem.answer)
+    session.close()
+
+    with open(logger.filename, newline='', encoding='utf-8') as file:
+        assert list(csv.reader(file))[1][2:] == ['4.0', '2']
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_history, write_history
+from src.model.problem import OPERATIONS, Problem
+from src.model.skills import TABLE_SHAPE, SkillModel, SkillSampler, load_skill_model, problem_cells
+from src.model.space import ProblemSpace
+
+SETTINGS = ({'addition': True, 'multiplication': True},
+            {'addition': {'operand1': (2, 30), 'operand2': (2, 30)},
+             'multiplication': {'operand1': (2, 12), 'operand2': (2, 12)}})
+
+
+def cell_of(text):
+    return np.unravel_index(problem_cells([text])[0], TABLE_SHAPE)
+
+
+def test_cells_tell_carries_borrows_and_tables_apart():
+    assert cell_of('15 + 4')[3] == 0 and cell_of('15 + 7')[3] == 1
+    assert cell_of('27 - 5')[3] == 0 and cell_of('21 - 5')[3] == 1
+    # Reversed operations are bucketed by the operands as drawn
+    assert cell_of('56 / 7') == cell_of('56 / 8') == (3, 7, 8, 0)
+    assert cell_of('7 * 8')[1:3] != cell_of('7 * 9')[1:3]
+    assert problem_cells(['seven * 8'])[0] == -1
+
+
+def test_online_folds_match_a_fit():
+    history = synthetic_history(2000, seed=13)
+    fitted = SkillModel()
+    fitted.fit(history)
+
+    folded = SkillModel()
+    for row in history.itertuples(index=False, name=None):
+        folded.update(None, row)
+    np.testing.assert_allclose(folded.ema, fitted.ema, rtol=1e-9)
+    np.testing.assert_array_equal(folded.count, fitted.count)
+    assert folded.count.sum() == 2000
+
+
+def test_estimates_fall_back_to_the_operation_average():
+    skill_model = SkillModel(prior_answers=3)
+    assert np.all(skill_model.estimates() == 1.0)
+
+    for _ in range(10):
+        skill_model.fold(Problem.from_text('7 * 8'), 6.0)
+    skill_model.fold(Problem.from_text('3 + 4'), 1.0)
+    estimates = skill_model.estimates()
+    multiplication = estimates.reshape(len(OPERATIONS), -1)[OPERATIONS.index('multiplication')]
+    assert estimates[problem_cells(['7 * 8'])[0]] == pytest.approx(6.0)
+    # Unseen multiplication cells take the multiplication average, unseen operations the overall one
+    assert np.allclose(multiplication, 6.0)
+    assert estimates[problem_cells(['5 - 2'])[0]] == pytest.approx((60 + 1) / 11)
+
+
+def test_skill_sampler_draws_new_problems_in_slow_cells(tmp_path):
+    write_history(str(tmp_path), 500, seed=14)
+    skill_model = load_skill_model(str(tmp_path))
+    assert sum(skill_model.fitted_rows.values()) == skill_model.count.sum() == 500
+    slow = problem_cells(['11 * 12'])[0]
+    with skill_model.lock:
+        skill_model.ema[slow], skill_model.count[slow] = 1000.0, 20
+
+    space = ProblemSpace(*SETTINGS)
+    sampler = SkillSampler(skill_model, space, fallback=lambda: None, seed=3, min_interval=0)
+    sampler.wait_ready()
+    problems = [problem for problem, _ in zip(sampler.problems(), range(2000))]
+
+    keys, inside = space.problem_keys(map(str, problems))
+    assert inside.all()
+    # Drawn several times as often as random generation would draw it
+    assert np.mean(problem_cells(list(map(str, problems))) == slow) > 5 * space.shares[slow] / space.shares.sum()
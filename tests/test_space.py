@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.model import space as space_module
+from src.model.generator import ProblemGenerator
+from src.model.space import ProblemSpace, settings_key
+
+OPERATIONS = {'addition': True, 'subtraction': True, 'multiplication': True, 'division': True}
+RANGES = {'addition': {'operand1': (2, 20), 'operand2': (2, 20)},
+          'multiplication': {'operand1': (2, 12), 'operand2': (2, 12)}}
+
+
+def test_space_is_cached_under_its_settings(tmp_path, monkeypatch):
+    built = ProblemSpace.load(OPERATIONS, RANGES, str(tmp_path))
+    assert os.listdir(tmp_path) == [f"space_{settings_key(OPERATIONS, RANGES)}.npz"]
+
+    def no_build(*args):
+        raise AssertionError("cached space was rebuilt")
+    monkeypatch.setattr(space_module, 'build_arrays', no_build)
+    cached = ProblemSpace.load(OPERATIONS, RANGES, str(tmp_path))
+    for name in space_module.ARRAYS:
+        np.testing.assert_array_equal(getattr(cached, name), getattr(built, name))
+
+    # Other settings hash to another file
+    with pytest.raises(AssertionError):
+        ProblemSpace.load({'addition': True}, RANGES, str(tmp_path))
+
+
+def test_space_holds_every_generated_problem():
+    space = ProblemSpace(OPERATIONS, RANGES)
+    generator = ProblemGenerator(OPERATIONS, RANGES, seed=1)
+    problems = [str(generator.next_problem()) for _ in range(5000)]
+
+    keys, inside = space.problem_keys(problems + ['101 + 1', '3 ^ 4'])
+    assert inside[:-2].all() and not inside[-2:].any()
+    covered, per_cell = space.coverage(problems)
+    assert 0.9 < covered <= 1.0
+    assert sum(total for seen, total in per_cell.values()) == len(space.keys)
+
+
+def test_sample_follows_shares_and_cell_weights():
+    space = ProblemSpace(OPERATIONS, RANGES)
+    rng = np.random.default_rng(2)
+    ops = space.op_codes[space.sample(20000, rng)]
+    # Operations are picked uniformly, like get_random_problem
+    np.testing.assert_allclose(np.bincount(ops, minlength=4) / 20000, 0.25, atol=0.02)
+
+    only = space.cells[0]
+    weights = np.zeros(space_module.CELLS)
+    weights[only] = 1.0
+    assert (space.entry_cells[space.sample(100, rng, weights)] == only).all()
+    assert space.problems([0])[0] == space.problem_at(0)
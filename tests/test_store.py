@@ -0,0 +1,202 @@
+import csv
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+from benchmarks.synthetic import write_history
+from src.model.store import HistoryStore
+from src.model.utils import WeightModel
+
+HEADER = ['session_timestamp', 'problem', 'duration_seconds', 'attempts']
+TIMESTAMP = '2030-01-01 00:00:00'
+
+
+def write_log(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def answer_count(store):
+    return store.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_sync_ingests_appended_rows_once(tmp_path, store):
+    path = tmp_path / 'math_practice_20300101_000000.csv'
+    rows = [(TIMESTAMP, f"{i} + 1", 1.5, 1) for i in range(5)]
+    write_log(path, rows[:3])
+    store.sync()
+    write_log(path, rows)
+    store.sync()
+    store.sync()
+
+    assert answer_count(store) == 5
+    assert store.read_manifest() == {'math_practice_20300101_000000': (os.path.getsize(path), 5)}
+
+
+def test_sync_skips_and_reports_malformed_rows(tmp_path, store, capsys):
+    path = tmp_path / 'math_practice_20300101_000000.csv'
+    rows = [(TIMESTAMP, f"{i} + 1", 1.5, 1) for i in range(3)]
+    write_log(path, rows[:1] + [(TIMESTAMP, '9 + 9', 'slow', 1)] + rows[1:])
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(f"{TIMESTAMP},3 + 4,1.2,")
+    store.sync()
+
+    assert answer_count(store) == 3
+    assert 'lines 3' in capsys.readouterr().err
+    # Logged rows keep their numbers past the bad one
+    store.record_answer(str(path), rows[2], 3)
+    assert answer_count(store) == 3
+
+    # The cut-off line is read once it is complete
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write("1\n")
+    store.sync()
+    assert answer_count(store) == 4
+    assert store.read_manifest()['math_practice_20300101_000000'] == (os.path.getsize(path), 5)
+
+
+def test_recorded_rows_are_not_ingested_again(tmp_path, store):
+    path = tmp_path / 'math_practice_20300101_000000.csv'
+    rows = [(TIMESTAMP, f"{i} + 1", 1.5, 1) for i in range(4)]
+    for row_number, row in enumerate(rows):
+        store.record_answer(str(path), row, row_number)
+
+    # The logger's buffer has only reached the file in part, as after a crash
+    write_log(path, rows[:2])
+    store.sync()
+    assert answer_count(store) == 4
+    assert store.read_manifest()['math_practice_20300101_000000'] == (os.path.getsize(path), 2)
+
+    write_log(path, rows)
+    store.sync()
+    assert answer_count(store) == 4
+    assert store.read_manifest()['math_practice_20300101_000000'] == (os.path.getsize(path), 4)
+
+
+def test_rows_synced_by_another_store_before_they_are_recorded_are_stored_once(tmp_path, store):
+    path = tmp_path / 'math_practice_20300101_000000.csv'
+    rows = [(TIMESTAMP, "3 + 3", 1.5, 1), (TIMESTAMP, "4 + 3", 2.5, 1)]
+    store.record_answer(str(path), rows[0], 0)
+    write_log(path, rows)
+    other = HistoryStore(str(tmp_path))
+    other.sync()
+    other.close()
+    store.record_answer(str(path), rows[1], 1)
+
+    assert answer_count(store) == 2
+    assert store.read_manifest()['math_practice_20300101_000000'] == (os.path.getsize(path), 2)
+
+
+def test_save_weights_refuses_an_older_watermark(store):
+    row = ('2 + 2', 'addition', 2, 2, 1.0, 1, TIMESTAMP)
+    assert store.save_weights([row], 5, 0)
+    assert not store.save_weights([row[:4] + (9.0,) + row[5:]], 3, 0)
+    assert store.load_weights() == [row]
+    assert store.save_weights([row], 5, 0)
+
+
+def test_save_weights_refuses_an_older_generation(store):
+    row = ('2 + 2', 'addition', 2, 2, 1.0, 1, TIMESTAMP)
+    with store.transaction():
+        store.delete_weights()
+    assert not store.save_weights([row], 5, 0)
+    assert store.load_weights() == []
+    assert store.save_weights([row], 5, 1)
+
+
+def test_weight_models_sharing_a_store_agree(tmp_path):
+    write_history(str(tmp_path), 500, seed=1)
+    stores = [HistoryStore(str(tmp_path)) for _ in range(2)]
+    stores[0].sync()
+    models = [WeightModel(store) for store in stores]
+
+    for i in range(20):
+        models[i % 2].update(None, (TIMESTAMP, f"{i % 3} + 7", 1.0 + i, 1))
+    for weight_model in models:
+        weight_model.catch_up()
+
+    rebuilt = HistoryStore(str(tmp_path))
+    with rebuilt.transaction():
+        rebuilt.delete_weights()
+    expected = WeightModel(rebuilt).entries
+    for weight_model in models:
+        assert weight_model.entries.keys() == expected.keys()
+        for problem, (ema, count) in expected.items():
+            assert weight_model.entries[problem][0] == pytest.approx(ema)
+            assert weight_model.entries[problem][1] == count
+    for store in stores + [rebuilt]:
+        store.close()
+
+
+def test_answers_logged_during_the_model_load_are_stored_once(tmp_path, monkeypatch):
+    from src.base import math_loop
+    from src.base.logger import SessionLogger
+    from src.base.session import Session
+
+    released = threading.Event()
+    load_model = math_loop.load_model
+
+    def delayed_load_model(*args):
+        released.wait()
+        return load_model(*args)
+    monkeypatch.setattr(math_loop, 'load_model', delayed_load_model)
+
+    settings = {'operations': {'addition': True}, 'ranges': {}, 'dynamic': True}
+    question_base = math_loop.QuestionBase(settings, seed=1, data_dir=str(tmp_path))
+    logger = SessionLogger(str(tmp_path), datetime(2030, 1, 1))
+    session = Session(question_base, logger)
+    session.next_problem()
+
+    for _ in range(5):
+        session.submit(session.current_problem.answer)
+    # These rows reach the file before the loader's sync, so it stores them itself
+    logger.flush()
+    released.set()
+    question_base.model_future.result()
+    for _ in range(5):
+        session.submit(session.current_problem.answer)
+    question_base.wait_for_answers()
+    session.close()
+
+    store = HistoryStore(str(tmp_path))
+    store.sync()
+    assert answer_count(store) == 10
+    assert store.read_manifest()['math_practice_20300101_000000'][1] == 10
+    assert sum(count for ema, count in question_base.weight_model.entries.values()) == 10
+    store.close()
+
+
+def test_iter_frames_streams_compact_chunks_in_order(tmp_path, store):
+    write_history(str(tmp_path), 1200, seed=12)
+    store.sync()
+    chunks = list(store.iter_frames(chunk_rows=500))
+    whole = store.read_frame(chunk_rows=500)
+
+    assert [len(chunk) for chunk in chunks] == [500, 500, 200]
+    assert all(chunk['problem'].dtype == 'category' and chunk['attempts'].dtype == 'uint16' for chunk in chunks)
+    as_text = {'problem': str, 'session_timestamp': str}
+    streamed = [row for chunk in chunks for row in chunk.astype(as_text).itertuples(index=False)]
+    assert streamed == list(whole.astype(as_text).itertuples(index=False))
+    assert store.load_stats['rows'] == 1200 and store.load_stats['chunks'] == 3
+
+
+def test_read_frame_stops_at_its_memory_limit(tmp_path, store):
+    write_history(str(tmp_path), 1200, seed=12)
+    store.sync()
+    frame = store.read_frame(chunk_rows=100)
+    assert frame['duration_seconds'].dtype == 'float32'
+    assert 0 < store.load_stats['peak_bytes'] < 1200 * 100
+
+    with pytest.raises(MemoryError):
+        store.read_frame(chunk_rows=100, memory_limit=1000)